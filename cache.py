@@ -0,0 +1,94 @@
+# coding=utf-8
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class TTLCache:
+    """
+    Bounded LRU cache whose entries are fresh for ``ttl`` seconds.
+
+    Expired entries are kept (up to ``max_stale`` seconds) so that callers can opt in to
+    stale-while-revalidate: the stale value is returned immediately and refreshed in the background.
+    """
+
+    def __init__(self, maxsize: int = 512, ttl: float = 300, max_stale: float = 86400):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._refreshing: dict[Hashable, asyncio.Task] = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def set(self, key: Hashable, value: Any):
+        self._data[key] = (time.monotonic(), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value regardless of age, without touching LRU order or counters."""
+        entry = self._data.get(key)
+        return default if entry is None else entry[1]
+
+    def items(self):
+        return [(key, value) for key, (_, value) in self._data.items()]
+
+    def invalidate(self, key: Hashable):
+        self._data.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[Hashable, Any], bool]):
+        for key in [key for key, (_, value) in self._data.items() if predicate(key, value)]:
+            del self._data[key]
+
+    def clear(self):
+        self._data.clear()
+
+    async def get_or_fetch(self, key: Hashable, fetch: Callable[[], Awaitable[Any]],
+                           stale_while_revalidate: bool = False) -> Any:
+        entry = self._data.get(key)
+        if entry is not None:
+            age = time.monotonic() - entry[0]
+            if age <= self.ttl:
+                self.hits += 1
+                self._data.move_to_end(key)
+                return entry[1]
+            if stale_while_revalidate and age <= self.ttl + self.max_stale:
+                self.stale_hits += 1
+                self._data.move_to_end(key)
+                if key not in self._refreshing:
+                    task = asyncio.create_task(self._refresh(key, fetch))
+                    self._refreshing[key] = task
+                return entry[1]
+        self.misses += 1
+        value = await fetch()
+        self.set(key, value)
+        return value
+
+    async def _refresh(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]):
+        try:
+            self.set(key, await fetch())
+        except Exception as e:
+            logging.warning(f"Failed to refresh cache entry {key}: {type(e).__name__}: {str(e)}")
+        finally:
+            self._refreshing.pop(key, None)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_ratio": (self.hits + self.stale_hits) / lookups if lookups else 0.0,
+        }
@@ -1,17 +1,15 @@
 # coding=utf-8
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
 from discord import Embed
 import os
 import datetime
 import zoneinfo
 from pathlib import Path
 import logging
-from websockets.asyncio.client import connect, ClientConnection, USER_AGENT
-import asyncio
-from json import loads
 
 from roboweb_api import RobowebAPI
+from ws_events import Event, AnnouncementPayload
 
 base_dir = os.path.abspath(os.path.dirname(__file__))
 parent_dir = str(Path(__file__).parent.parent.absolute())
@@ -20,113 +18,100 @@ default_color = 0x012a5e
 error_color = 0xF1411C
 
 ANNOUNCE_CHANNEL_ID = int(os.getenv("ANNOUNCE_CHANNEL_ID", "1128232150135738529"))
-ANNOUNCEMENT_TASKS: dict[str, dict[str, tasks.Loop | None]] = {}
 
 
 class Announcement(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.rwapi: RobowebAPI | None = None
-        self.ws: ClientConnection | None = None
+        self.rwapi: RobowebAPI = bot.rwapi
+        for event_type, handler in (
+                ("announcement.pin", self.on_announcement_pin),
+                ("announcement.announce", self.on_announcement_announce),
+                ("announcement.delete", self.on_announcement_unpin_or_delete),
+                ("announcement.unpin", self.on_announcement_unpin_or_delete),
+        ):
+            bot.ws_manager.register("announcement", event_type, handler)
+        # unpins are always caught up, however late
+        bot.scheduler.register("announcement.unpin", self.unpin_announcement, AnnouncementPayload.from_dict)
+
+    def cog_unload(self):
+        self.bot.ws_manager.unregister(self)
+        self.bot.scheduler.unregister(self)
 
     @commands.Cog.listener()
     async def on_ready(self):
-        if not self.rwapi:
-            self.rwapi = RobowebAPI(os.getenv("ROBOWEB_API_TOKEN"))
-        await self.reload_unpin_tasks(None)
-
-        max_retries = 15
-        retries = 0
-        retry_delay = 2
-        while retries <= max_retries:
-            logging.info(f"Attempting to connect to WebSocket (Attempt {retries + 1}/{max_retries})...")
-            try:
-                async with (connect(f"{os.getenv('WS_URL')}announcement/",
-                                    additional_headers={"Authorization": f"Token {os.getenv("ROBOWEB_API_TOKEN")}"},
-                                    user_agent_header=USER_AGENT + " New-Robomania-Bot")
-                            as websocket):
-                    self.ws = websocket
-                    logging.info("Connected to WebSocket successfully.")
-                    retries = 0
-                    retry_delay = 2
-                    while True:
-                        data = loads(await websocket.recv())
-                        if data["type"] == "announcement.pin":
-                            announcement = data["announcement"]
-                            self.setup_tasks(announcement)
-                        elif data["type"] == "announcement.announce":
-                            announcement = data["announcement"]
-                            message = f"""\
+        try:
+            await self.reconcile_unpin_tasks()
+        except Exception as e:
+            logging.error(f"Failed to reconcile unpin tasks: {type(e).__name__}: {str(e)}")
+
+    async def reconcile_unpin_tasks(self):
+        """
+        Bring the restored unpin jobs in line with the panel, only touching announcements that changed while the
+        bot was down.
+        """
+        await self.bot.scheduler.restored.wait()
+        pinned = {announcement["id"]: announcement for announcement in await self.rwapi.get_pinned_announcements()}
+        changed = 0
+        for announcement_id, data in pinned.items():
+            job = self.bot.scheduler.get(f"announcement:{announcement_id}:unpin")
+            if job is not None and job.payload.raw == data:
+                continue
+            announcement = AnnouncementPayload.from_dict(data)
+            if announcement.pin_until is not None and announcement.pin_until < datetime.datetime.now(now_tz):
+                await self.unpin_announcement(announcement)
+            else:
+                self.setup_tasks(announcement)
+            changed += 1
+        removed = self.bot.scheduler.cancel_where(
+            lambda job: job.kind == "announcement.unpin" and job.payload.id not in pinned
+        )
+        logging.info(f"Reconciled unpin tasks: {changed} announcement(s) updated, {removed} task(s) removed")
+
+    async def on_announcement_pin(self, event: Event):
+        self.setup_tasks(event.payload)
+
+    async def on_announcement_announce(self, event: Event):
+        announcement: AnnouncementPayload = event.payload
+        message = f"""\
 @everyone
 > 此公告由 Robomania Bot Web 同步發布至此。
-# {announcement['title']}
-{announcement['content']}
+# {announcement.title}
+{announcement.content}
 """
-                            if len(message) > 2000:
-                                message = message[:1997] + "..."
-                            channel = self.bot.get_channel(ANNOUNCE_CHANNEL_ID)
-                            await channel.send(message)
-                        elif data["type"] in ("announcement.delete", "announcement.unpin"):
-                            announcement_id = data["announcement"]["id"]
-                            if announcement_id in ANNOUNCEMENT_TASKS.keys():
-                                for task_type, task in ANNOUNCEMENT_TASKS[announcement_id].items():
-                                    if task:
-                                        logging.debug(f"(#{announcement_id:2d}) "
-                                                      f"Cancelling existing \"{task_type}\" task")
-                                        task.cancel()
-                                del ANNOUNCEMENT_TASKS[announcement_id]
-                        else:
-                            logging.info(f"Received unknown event: {data}")
-            except Exception as e:
-                retries += 1
-                retry_delay *= 2  # Exponential backoff
-                logging.error(f"An error occurred: {type(e).__name__}: {str(e)}. "
-                              f"Attempting to reconnect in {retry_delay} seconds...")
-                await asyncio.sleep(retry_delay)
-        logging.error("Max retries reached. Could not connect to WebSocket.")
-
-    def setup_tasks(self, announcement: dict):
-        announcement_id = announcement["id"]
-        logging.debug(f"Setting up tasks for announcement #{announcement_id}")
-        if announcement_id in ANNOUNCEMENT_TASKS.keys():
-            for task_type, task in ANNOUNCEMENT_TASKS[announcement_id].items():
-                if task:
-                    logging.debug(f"(#{announcement_id:2d}) Cancelling existing \"{task_type}\" task")
-                    task.cancel()
-        pin_due_time = datetime.datetime.fromisoformat(announcement["pin_until"])
-        ANNOUNCEMENT_TASKS[announcement_id] = {
-            "unpin": tasks.Loop(
-                coro=self.unpin_announcement,
-                seconds=tasks.MISSING,
-                minutes=tasks.MISSING,
-                hours=tasks.MISSING,
-                time=pin_due_time.timetz(),
-                count=None,
-                reconnect=True,
-                loop=self.bot.loop,
-            )
-        }
-        ANNOUNCEMENT_TASKS[announcement_id]["unpin"].start(announcement)
-
-    async def unpin_announcement(self, announcement: dict, is_manual: bool = False):
-        pin_due_date = datetime.datetime.fromisoformat(announcement["pin_until"])
-        if pin_due_date - datetime.datetime.now(now_tz) > datetime.timedelta(seconds=1000):
+        if len(message) > 2000:
+            message = message[:1997] + "..."
+        channel = self.bot.get_channel(ANNOUNCE_CHANNEL_ID)
+        await channel.send(message)
+
+    async def on_announcement_unpin_or_delete(self, event: Event):
+        announcement_id = event.payload.id
+        if self.bot.scheduler.cancel(f"announcement:{announcement_id}:unpin"):
+            logging.debug(f"(#{announcement_id:2d}) Cancelled existing \"unpin\" task")
+
+    def setup_tasks(self, announcement: AnnouncementPayload):
+        if announcement.pin_until is None:
             return
-        if self.ws:
-            await self.ws.send(f'{{"type":"announcement.unpin","announcement_id":{announcement["id"]}}}')
-            logging.info(f"Unpinned announcement #{announcement['id']}")
+        logging.debug(f"Setting up tasks for announcement #{announcement.id}")
+        # scheduling replaces any existing unpin job of this announcement
+        self.bot.scheduler.schedule(f"announcement:{announcement.id}:unpin", announcement.pin_until,
+                                    "announcement.unpin", announcement)
+
+    async def unpin_announcement(self, announcement: AnnouncementPayload):
+        if await self.bot.ws_manager.send(
+                "announcement", {"type": "announcement.unpin", "announcement_id": announcement.id},
+                coalesce_key=f"announcement.unpin:{announcement.id}"):
+            logging.info(f"Unpinned announcement #{announcement.id}")
         else:
-            logging.error(f"Unable to unpin announcement #{announcement['id']}: WebSocket not connected")
-        if not is_manual:
-            ANNOUNCEMENT_TASKS[announcement["id"]]["unpin"].stop()
-            del ANNOUNCEMENT_TASKS[announcement["id"]]
+            logging.warning(f"WebSocket not connected; unpin of announcement #{announcement.id} "
+                            f"will be sent after reconnecting")
 
     ANNOUNCEMENT_CMDS = discord.SlashCommandGroup("announcement", "公告相關指令。")
 
     @ANNOUNCEMENT_CMDS.command(name="test")
     @commands.is_owner()
     async def test(self, ctx: discord.ApplicationContext):
-        await self.ws.send('{"type":"test.message","message":"test"}')
+        await self.bot.ws_manager.send("announcement", {"type": "test.message", "message": "test"})
         await ctx.respond("Test message sent.")
 
     @ANNOUNCEMENT_CMDS.command(name="重新載入任務", description="重新載入所有取消釘選公告的任務。")
@@ -134,14 +119,9 @@ class Announcement(commands.Cog):
     async def reload_unpin_tasks(self, ctx: discord.ApplicationContext = None):
         try:
             announcements = await self.rwapi.get_pinned_announcements()
-            for ann_id in ANNOUNCEMENT_TASKS.keys():
-                for _, task in ANNOUNCEMENT_TASKS[ann_id].items():
-                    if task:
-                        task.cancel()
-            ANNOUNCEMENT_TASKS.clear()
-            for announcement in announcements:
-                pin_due_date = datetime.datetime.fromisoformat(announcement["pin_until"])
-                if pin_due_date < datetime.datetime.now(now_tz):
+            self.bot.scheduler.cancel_where(lambda job: job.kind == "announcement.unpin")
+            for announcement in map(AnnouncementPayload.from_dict, announcements):
+                if announcement.pin_until is not None and announcement.pin_until < datetime.datetime.now(now_tz):
                     await self.unpin_announcement(announcement)
                 else:
                     self.setup_tasks(announcement)
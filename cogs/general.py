@@ -1,6 +1,6 @@
 # coding=utf-8
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import Option, Embed
 from discord.ui import View, Button
 import os
@@ -10,26 +10,46 @@ import logging
 import time
 import datetime
 import zoneinfo
-from typing import Literal
 from pathlib import Path
-from websockets.asyncio.client import connect, ClientConnection, USER_AGENT
-from json import loads
 import asyncio
 
 from roboweb_api import RobowebAPI
+from ws_events import Event, LoginPayload
+from voice_log import VoiceActivityLog
+from voice_digest import VoiceDigest
+from voice_sessions import VoiceSessionStore, month_of
 
 error_color = 0xF1411C
 default_color = 0x012a5e
 now_tz = zoneinfo.ZoneInfo("Asia/Taipei")
 base_dir = os.path.abspath(os.path.dirname(__file__))
 parent_dir = str(Path(__file__).parent.parent.absolute())
+# Prometheus textfile-collector output for Roboweb API metrics; exported every minute when set
+METRICS_TEXTFILE = os.getenv("METRICS_TEXTFILE")
 
 
 class General(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.rwapi: RobowebAPI | None = None
-        self.ws: ClientConnection | None = None
+        self.rwapi: RobowebAPI = bot.rwapi
+        bot.ws_manager.register("auth", "auth.new_login", self.on_new_login)
+        self.vc_log = VoiceActivityLog(os.path.join(base_dir, "logs"))
+        self.voice_sessions = VoiceSessionStore()
+        self.vc_digest = VoiceDigest()
+        # voice events only arrive while connected to the gateway; see VoiceSessionStore.beat()
+        self.gateway_connected = False
+        if bot.is_ready():
+            # reloaded: on_ready won't fire again, and close() ended the previous instance's sessions
+            self.reconcile_voice()
+            self.gateway_connected = True
+            self.voice_heartbeat.start()
+
+    def cog_unload(self):
+        self.bot.ws_manager.unregister(self)
+        self.voice_heartbeat.cancel()
+        self.vc_log.close()
+        self.voice_sessions.close()
+        self.vc_digest.close()
 
     class GenerateLoginCodeView(View):
         def __init__(self, rwapi: RobowebAPI):
@@ -106,48 +126,55 @@ class General(commands.Cog):
 
     @commands.Cog.listener()
     async def on_ready(self):
-        if not self.rwapi:
-            self.rwapi = RobowebAPI(os.getenv("ROBOWEB_API_TOKEN"))
         self.bot.add_view(self.GenerateLoginCodeView(self.rwapi))
+        if METRICS_TEXTFILE and not self.export_api_metrics.is_running():
+            self.export_api_metrics.start()
+        # voice events may have been missed while the bot was offline or disconnected
+        self.reconcile_voice()
+        self.gateway_connected = True
+        if not self.voice_heartbeat.is_running():
+            self.voice_heartbeat.start()
 
-        max_retries = 15
-        retries = 0
-        retry_delay = 2
-        while retries <= max_retries:
-            logging.info(f"Attempting to connect to WebSocket (Attempt {retries + 1}/{max_retries})...")
-            try:
-                async with (connect(f"{os.getenv('WS_URL')}auth/",
-                                    additional_headers={"Authorization": f"Token {os.getenv("ROBOWEB_API_TOKEN")}"},
-                                    user_agent_header=USER_AGENT + " New-Robomania-Bot")
-                            as websocket):
-                    self.ws = websocket
-                    logging.info("Connected to WebSocket successfully.")
-                    retries = 0
-                    retry_delay = 2
-                    while True:
-                        data = loads(await websocket.recv())
-                        if data["type"] == "auth.new_login":
-                            embed = Embed(
-                                title="新的登入通知",
-                                description="有人在隊務管理面板登入了你的帳號。請確認是否為你本人所進行的操作。\n"
-                                            "如果你懷疑你的帳號遭到盜用，請立即更換密碼，並告知管理員。",
-                                color=default_color,
-                            )
-                            embed.add_field(name="IP 位址", value=f"`{data['ip']}`", inline=False)
-                            embed.add_field(name="使用者代理", value=f"```{data['user_agent']}```", inline=False)
-                            embed.add_field(name="登入方式", value=data["method"], inline=False)
-                            embed.timestamp = datetime.datetime.now(tz=now_tz)
-                            member = self.bot.get_user(int(data["member_discord_id"]))
-                            await member.send(embed=embed)
-                        else:
-                            logging.info(f"Received unknown event: {data}")
-            except Exception as e:
-                retries += 1
-                retry_delay *= 2  # Exponential backoff
-                logging.error(f"An error occurred: {type(e).__name__}: {str(e)}. "
-                              f"Attempting to reconnect in {retry_delay} seconds...")
-                await asyncio.sleep(retry_delay)
-        logging.error("Max retries reached. Could not connect to WebSocket.")
+    @commands.Cog.listener()
+    async def on_resumed(self):
+        # the gateway replays events missed during a resumed session
+        self.gateway_connected = True
+
+    @commands.Cog.listener()
+    async def on_disconnect(self):
+        if self.gateway_connected:
+            self.voice_sessions.beat()
+        self.gateway_connected = False
+
+    def reconcile_voice(self):
+        current = {}
+        for guild in self.bot.guilds:
+            for channel in guild.voice_channels + guild.stage_channels:
+                for member in channel.members:
+                    if not member.bot:
+                        current[member.id] = channel.id
+        self.voice_sessions.reconcile(current)
+        self.bot.voice_roster.rebuild(current)
+
+    @tasks.loop(seconds=VoiceSessionStore.HEARTBEAT_SECONDS)
+    async def voice_heartbeat(self):
+        if self.gateway_connected:
+            self.voice_sessions.beat()
+
+    async def on_new_login(self, event: Event):
+        login: LoginPayload = event.payload
+        embed = Embed(
+            title="新的登入通知",
+            description="有人在隊務管理面板登入了你的帳號。請確認是否為你本人所進行的操作。\n"
+                        "如果你懷疑你的帳號遭到盜用，請立即更換密碼，並告知管理員。",
+            color=default_color,
+        )
+        embed.add_field(name="IP 位址", value=f"`{login.ip}`", inline=False)
+        embed.add_field(name="使用者代理", value=f"```{login.user_agent}```", inline=False)
+        embed.add_field(name="登入方式", value=login.method, inline=False)
+        embed.timestamp = datetime.datetime.now(tz=now_tz)
+        member = self.bot.get_user(login.member_discord_id)
+        await member.send(embed=embed)
 
     @commands.Cog.listener()
     async def on_voice_state_update(
@@ -160,63 +187,35 @@ class General(commands.Cog):
                 or after.channel is None
                 or before.channel.id != after.channel.id
         ):
-            member_real_name = await self.rwapi.search_members(discord_id=member.id)
-            if isinstance(member_real_name, list) and len(member_real_name) > 0:
-                member_real_name = member_real_name[0]["real_name"]
+            event_time = int(time.time())
+            if before.channel is not None:
+                self.voice_sessions.leave(member.id)
+                self.bot.voice_roster.leave(member.id)
+            if after.channel is not None:
+                self.voice_sessions.join(member.id, after.channel.id)
+                self.bot.voice_roster.join(member.id, after.channel.id)
+            # a slightly stale name is fine here; it keeps the join/leave message from waiting on the API
+            search_result = await self.rwapi.search_members(cached=True, stale_ok=True, discord_id=member.id)
+            member_real_name = None
+            if isinstance(search_result, list) and len(search_result) > 0:
+                member_real_name = search_result[0]["real_name"]
             if member_real_name is None:
                 member_real_name = member.name
+            # notices are coalesced per channel, so a burst of joins is one message (and a few edits)
             if not isinstance(before.channel, type(None)):
-                await before.channel.send(
+                self.vc_digest.add(
+                    before.channel,
                     f"<:left:1208779447440777226> **{member_real_name}** "
-                    f"在 <t:{int(time.time())}:T> 離開 {before.channel.mention}。",
-                    delete_after=43200,
+                    f"在 <t:{event_time}:T> 離開 {before.channel.mention}。",
                 )
-                self.log_vc_activity("leave", member, before.channel)
+                self.vc_log.record("leave", member, before.channel)
             if not isinstance(after.channel, type(None)):
-                await after.channel.send(
+                self.vc_digest.add(
+                    after.channel,
                     f"<:join:1208779348438683668> **{member_real_name}** "
-                    f"在 <t:{int(time.time())}:T> 加入 {after.channel.mention}。",
-                    delete_after=43200,
+                    f"在 <t:{event_time}:T> 加入 {after.channel.mention}。",
                 )
-                self.log_vc_activity("join", member, after.channel)
-
-    VC_LOGGER = logging.getLogger("VC")
-
-    def log_vc_activity(
-            self,
-            join_or_leave: Literal["join", "leave"],
-            user: discord.User | discord.Member,
-            channel: discord.VoiceChannel,
-    ):
-        log_path = os.path.join(
-            base_dir,
-            "logs",
-            f"VC {datetime.datetime.now(tz=now_tz).strftime('%Y.%m.%d')}.log",
-        )
-        if not os.path.exists(log_path):
-            with open(log_path, "w"):
-                pass
-        original_handler: logging.FileHandler
-        try:
-            original_handler = self.VC_LOGGER.handlers[0]
-        except IndexError:
-            original_handler = logging.FileHandler("logs/VC.log")
-        if original_handler.baseFilename != log_path:
-            formatter = logging.Formatter(
-                fmt="[%(asctime)s] %(levelname)s %(message)s", datefmt="%Y-%m-%d %H:%M:%S"
-            )
-            log_path = os.path.join(
-                base_dir,
-                "logs",
-                f"VC {datetime.datetime.now(tz=now_tz).strftime('%Y.%m.%d')}.log",
-            )
-            handler = logging.FileHandler(log_path, encoding="utf-8")
-            handler.setFormatter(formatter)
-            self.VC_LOGGER.addHandler(handler)
-            self.VC_LOGGER.removeHandler(original_handler)
-        join_or_leave = "加入" if join_or_leave == "join" else "離開"
-        message = user.name + " " + join_or_leave + "了 " + channel.name
-        self.VC_LOGGER.info(message)
+                self.vc_log.record("join", member, after.channel)
 
     @commands.slash_command(name="clear", description="清除目前頻道中的訊息。")
     @commands.has_role(1114205838144454807)
@@ -324,6 +323,85 @@ class General(commands.Cog):
                 )
                 os.remove(txt_file_path)
 
+    @tasks.loop(minutes=1)
+    async def export_api_metrics(self):
+        try:
+            await asyncio.to_thread(self.rwapi.metrics.write_prometheus, METRICS_TEXTFILE)
+        except Exception as e:
+            logging.error(f"Failed to export API metrics: {type(e).__name__}: {str(e)}")
+
+    @commands.slash_command(name="api統計", description="查看 Roboweb API 的呼叫統計。")
+    @commands.is_owner()
+    async def api_stats(
+            self,
+            ctx: discord.ApplicationContext,
+            export: Option(bool, "是否附上 Prometheus 格式的統計檔案", name="匯出", required=False) = False,
+    ):
+        await ctx.defer(ephemeral=True)
+        summary = self.rwapi.metrics.summary()
+        embed = Embed(title="Roboweb API 統計",
+                      description=f"斷路器狀態：`{self.rwapi.breaker.state}`",
+                      color=default_color)
+        for endpoint, stats in sorted(summary["endpoints"].items(), key=lambda x: -x[1]["calls"])[:20]:
+            status_str = ", ".join(f"{status}×{count}" for status, count in sorted(stats["status_counts"].items()))
+            embed.add_field(
+                name=endpoint,
+                value=f"呼叫 `{stats['calls']}` 次 ({status_str})\n"
+                      f"延遲 p50/p95/p99：`{stats['p50'] * 1000:.0f}` / `{stats['p95'] * 1000:.0f}` / "
+                      f"`{stats['p99'] * 1000:.0f}` ms\n"
+                      f"傳輸：↑ `{stats['bytes_sent']}` B ↓ `{stats['bytes_received']}` B",
+                inline=False,
+            )
+        cache_str = ""
+        for name, stats in summary["caches"].items():
+            cache_str += (f"- {name}：命中率 `{stats['hit_ratio']:.1%}` "
+                          f"(hit `{stats['hits']}` / stale `{stats['stale_hits']}` / miss `{stats['misses']}`)\n")
+        if cache_str:
+            embed.add_field(name="快取", value=cache_str, inline=False)
+        if export:
+            txt_file_path = os.path.join(parent_dir, "roboweb_api.prom")
+            await asyncio.to_thread(self.rwapi.metrics.write_prometheus, txt_file_path)
+            await ctx.respond(embed=embed, file=discord.File(txt_file_path), ephemeral=True)
+            os.remove(txt_file_path)
+        else:
+            await ctx.respond(embed=embed, ephemeral=True)
+
+    @commands.slash_command(name="語音時數", description="查看成員或頻道在指定月份的語音時數。")
+    async def voice_hours(
+            self,
+            ctx: discord.ApplicationContext,
+            month: Option(str, "月份 (YYYY-MM，預設為本月)", name="月份", required=False) = None,
+            scope: Option(str, name="統計對象", choices=["成員", "頻道"], description="依成員或頻道統計",
+                          required=False) = "成員",
+    ):
+        if month is None:
+            month = month_of(time.time())
+        try:
+            datetime.datetime.strptime(month, "%Y-%m")
+        except ValueError:
+            embed = Embed(title="錯誤：月份格式錯誤", description="月份格式應為 `YYYY-MM`，例如 `2025-09`。",
+                          color=error_color)
+            await ctx.respond(embed=embed, ephemeral=True)
+            return
+        if scope == "頻道":
+            totals = await self.voice_sessions.channel_totals(month)
+        else:
+            totals = await self.voice_sessions.member_totals(month)
+        lines = []
+        for rank, (key, seconds, sessions) in enumerate(totals[:25], start=1):
+            if scope == "頻道":
+                name = f"<#{key}>"
+            else:
+                record = self.rwapi.member_index.get_by_discord_id(key)
+                name = f"<@{key}>" + (f"({record['real_name']})" if record else "")
+            lines.append(f"{rank}. {name}：`{seconds / 3600:.1f}` 小時 ({sessions} 次)")
+        embed = Embed(title=f"{month} 語音時數",
+                      description="\n".join(lines) if lines else "這個月份沒有語音紀錄。",
+                      color=default_color)
+        if len(totals) > 25:
+            embed.set_footer(text=f"僅顯示前 25 名 (共 {len(totals)} 筆)")
+        await ctx.respond(embed=embed)
+
     @commands.slash_command(name="建立登入代碼按鈕", description="在目前頻道建立「產生登入代碼」的按鈕。")
     @commands.is_owner()
     async def create_login_code_button(
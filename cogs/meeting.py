@@ -1,6 +1,6 @@
 # coding=utf-8
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
 from discord import Embed, Option, ApplicationContext
 from discord.ui import View, Button
 import os
@@ -8,12 +8,11 @@ import logging
 import zoneinfo
 from pathlib import Path
 import datetime
-from websockets.asyncio.client import connect, USER_AGENT
 import asyncio
-from json import loads, dumps
-from pprint import pprint
+from dataclasses import dataclass, field
 
 from roboweb_api import RobowebAPI
+from ws_events import Event, MeetingPayload, AbsentRequestPayload
 
 error_color = 0xF1411C
 default_color = 0x012a5e
@@ -23,7 +22,16 @@ parent_dir = str(Path(__file__).parent.parent.absolute())
 
 NOTIFY_CHANNEL_ID = int(os.getenv("NOTIFY_CHANNEL_ID", "1128232150135738529"))
 ABSENT_REQ_CHANNEL_ID = int(os.getenv("ABSENT_REQ_CHANNEL_ID", "1126031617614426142"))
-MEETING_TASKS: dict[str, dict[str, tasks.Loop | None]] = {}
+SYNC_DEBOUNCE_SECONDS = 2
+# notices are rendered this long before they are due
+PREPARE_AHEAD = datetime.timedelta(seconds=int(os.getenv("MEETING_PREPARE_AHEAD", "60")))
+MEETING_JOB_KINDS = ("meeting.prepare_notify", "meeting.notify", "meeting.prepare_start", "meeting.start",
+                     "meeting.attendance")
+# attendance of meetings held in a voice channel is checked this long after they start
+ATTENDANCE_GRACE = datetime.timedelta(seconds=int(os.getenv("MEETING_ATTENDANCE_GRACE", "600")))
+# reminders / start notices missed by more than this many seconds while the bot was down are skipped
+MEETING_NOTIFY_CATCH_UP = float(os.getenv("MEETING_NOTIFY_CATCH_UP", "300"))
+MEETING_START_CATCH_UP = float(os.getenv("MEETING_START_CATCH_UP", "900"))
 
 
 # By Gemini
@@ -87,11 +95,56 @@ def dc_location_format(location: str) -> str:
     return location
 
 
+def dc_channel_id(location: str) -> int | None:
+    """The voice channel ID of a "dc-<channel ID>" meeting location, or None for other locations."""
+    if location.startswith("dc-") and location[3:].isdigit():
+        return int(location[3:])
+    return None
+
+
+@dataclass(slots=True)
+class PreparedNotice:
+    meeting: MeetingPayload
+    # message content (role mentions) and embed for the notify channel
+    content: str
+    embed: Embed
+    # recipient's Discord ID -> keyword arguments for the DM
+    dm_messages: dict[int, dict] = field(default_factory=dict)
+
+
 class Meeting(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.rwapi = None
-        self.ws = None
+        self.rwapi: RobowebAPI = bot.rwapi
+        # last roles / voice channels sent to the panel, used to send only deltas
+        self.roles_snapshot: dict[int, dict] | None = None
+        self.channels_snapshot: dict[int, dict] | None = None
+        self.pending_sync: set[str] = set()
+        self.sync_task: asyncio.Task | None = None
+        # (meeting id, "notify" / "start") -> notice rendered ahead of time
+        self.prepared: dict[tuple[int, str], PreparedNotice] = {}
+        for event_type, handler in (
+                ("meeting.request_initial_data", self.on_request_initial_data),
+                ("meeting.create", self.on_meeting_create_or_edit),
+                ("meeting.edit", self.on_meeting_create_or_edit),
+                ("meeting.delete", self.on_meeting_delete),
+                ("meeting.new_absent_request", self.on_new_absent_request),
+                ("meeting.review_absent_request", self.on_review_absent_request),
+        ):
+            bot.ws_manager.register("meeting", event_type, handler)
+        for kind, handler, catch_up in (
+                ("meeting.prepare_notify", self.prepare_notify_meeting, MEETING_NOTIFY_CATCH_UP),
+                ("meeting.notify", self.notify_meeting, MEETING_NOTIFY_CATCH_UP),
+                ("meeting.prepare_start", self.prepare_start_meeting, MEETING_START_CATCH_UP),
+                ("meeting.start", self.notify_start_meeting, MEETING_START_CATCH_UP),
+                # the voice roster doesn't survive a restart, so a late check would only report everyone as missing
+                ("meeting.attendance", self.report_attendance, 60),
+        ):
+            bot.scheduler.register(kind, handler, MeetingPayload.from_dict, catch_up=catch_up)
+
+    def cog_unload(self):
+        self.bot.ws_manager.unregister(self)
+        self.bot.scheduler.unregister(self)
 
     class MeetingURLView(View):
         def __init__(self, meeting_id: int):
@@ -103,9 +156,8 @@ class Meeting(commands.Cog):
                 emoji="🔗"
             ))
 
-    async def update_roles(self):
-        websocket = self.ws
-        roles_list = []
+    def build_roles(self) -> dict[int, dict]:
+        roles = {}
         frc_guild: discord.Guild = self.bot.guilds[0]
         for role in frc_guild.roles:
             if not (
@@ -115,23 +167,15 @@ class Meeting(commands.Cog):
                     role.is_premium_subscriber()
             ):
                 hex_color = f"#{str(hex(role.color.value))[2:].ljust(6, '0')}"
-                roles_list.append(
-                    {
-                        "id": role.id, "name": role.name,
-                        "color": hex_color,
-                        # "text_color": get_best_text_color(hex_color),
-                    }
-                )
-        await websocket.send(
-            dumps({
-                "type": "roles_update",
-                "roles": roles_list,
-            })
-        )
-
-    async def update_voice_channels(self):
-        websocket = self.ws
-        channels_list = {}
+                roles[role.id] = {
+                    "id": role.id, "name": role.name,
+                    "color": hex_color,
+                    # "text_color": get_best_text_color(hex_color),
+                }
+        return roles
+
+    def build_voice_channels(self) -> dict[int, dict]:
+        channels = {}
         frc_guild: discord.Guild = self.bot.guilds[0]
         # we only need voice channels for meeting purposes
         for channel in frc_guild.voice_channels:
@@ -140,260 +184,384 @@ class Meeting(commands.Cog):
                 category = category.name
             else:
                 category = "(無分類)"
-            if category not in channels_list.keys():
-                channels_list[category] = []
-            channels_list[category].append(
-                {"id": channel.id, "name": channel.name}
+            channels[channel.id] = {"id": channel.id, "name": channel.name, "category": category}
+        return channels
+
+    async def update_roles(self):
+        roles = self.build_roles()
+        await self.bot.ws_manager.send("meeting", {
+            "type": "roles_update",
+            "roles": list(roles.values()),
+        }, coalesce_key="roles_update")
+        self.roles_snapshot = roles
+
+    async def update_voice_channels(self):
+        channels = self.build_voice_channels()
+        channels_list = {}
+        for channel in channels.values():
+            if channel["category"] not in channels_list.keys():
+                channels_list[channel["category"]] = []
+            channels_list[channel["category"]].append(
+                {"id": channel["id"], "name": channel["name"]}
             )
-        await websocket.send(
-            dumps({
-                "type": "channels_update",
-                "channels": channels_list,
+        await self.bot.ws_manager.send("meeting", {
+            "type": "channels_update",
+            "channels": channels_list,
+        }, coalesce_key="channels_update")
+        self.channels_snapshot = channels
+
+    @staticmethod
+    def diff_snapshot(old: dict[int, dict], new: dict[int, dict]) -> tuple[list[dict], list[int]]:
+        upserted = [item for item_id, item in new.items() if old.get(item_id) != item]
+        removed = [item_id for item_id in old.keys() if item_id not in new]
+        return upserted, removed
+
+    async def sync_roles(self):
+        if self.roles_snapshot is None:
+            await self.update_roles()
+            return
+        roles = self.build_roles()
+        upserted, removed = self.diff_snapshot(self.roles_snapshot, roles)
+        if upserted or removed:
+            await self.bot.ws_manager.send("meeting", {
+                "type": "roles_delta",
+                "upserted": upserted,
+                "removed": removed,
             })
-        )
+        self.roles_snapshot = roles
+
+    async def sync_voice_channels(self):
+        if self.channels_snapshot is None:
+            await self.update_voice_channels()
+            return
+        channels = self.build_voice_channels()
+        upserted, removed = self.diff_snapshot(self.channels_snapshot, channels)
+        if upserted or removed:
+            await self.bot.ws_manager.send("meeting", {
+                "type": "channels_delta",
+                "upserted": upserted,
+                "removed": removed,
+            })
+        self.channels_snapshot = channels
+
+    def schedule_sync(self, kind: str):
+        # Discord sends bursts of update events (e.g. dozens when roles or channels are reordered),
+        # so collect them for SYNC_DEBOUNCE_SECONDS and then send a single delta
+        self.pending_sync.add(kind)
+        if self.sync_task is None or self.sync_task.done():
+            self.sync_task = asyncio.create_task(self.run_pending_sync())
+
+    async def run_pending_sync(self):
+        # events arriving while a delta is being sent start another round instead of being dropped
+        while self.pending_sync:
+            await asyncio.sleep(SYNC_DEBOUNCE_SECONDS)
+            kinds, self.pending_sync = self.pending_sync, set()
+            try:
+                if "roles" in kinds:
+                    await self.sync_roles()
+                if "channels" in kinds:
+                    await self.sync_voice_channels()
+            except Exception as e:
+                logging.error(f"Failed to sync roles / channels: {type(e).__name__}: {str(e)}")
 
     # send updated roles and channels on update events
 
     @commands.Cog.listener()
     async def on_guild_role_create(self, role: discord.Role):
-        await self.update_roles()
+        self.schedule_sync("roles")
 
     @commands.Cog.listener()
     async def on_guild_role_delete(self, role: discord.Role):
-        await self.update_roles()
+        self.schedule_sync("roles")
 
     @commands.Cog.listener()
     async def on_guild_role_update(self, before: discord.Role, after: discord.Role):
-        await self.update_roles()
+        # position / permission changes don't affect what the panel shows
+        if before.name != after.name or before.color != after.color:
+            self.schedule_sync("roles")
+
+    @staticmethod
+    def is_relevant_channel(channel) -> bool:
+        return isinstance(channel, discord.VoiceChannel) or (
+                isinstance(channel, discord.CategoryChannel) and len(channel.voice_channels) > 0
+        )
 
     @commands.Cog.listener()
     async def on_guild_channel_update(self, before, after):
-        await self.update_voice_channels()
+        if not (self.is_relevant_channel(before) or self.is_relevant_channel(after)):
+            return
+        if before.name != after.name or getattr(before, "category_id", None) != getattr(after, "category_id", None):
+            self.schedule_sync("channels")
 
     @commands.Cog.listener()
     async def on_guild_channel_create(self, channel):
-        await self.update_voice_channels()
+        if isinstance(channel, discord.VoiceChannel):
+            self.schedule_sync("channels")
 
     @commands.Cog.listener()
     async def on_guild_channel_delete(self, channel):
-        await self.update_voice_channels()
+        if isinstance(channel, discord.VoiceChannel):
+            self.schedule_sync("channels")
 
     @commands.Cog.listener()
     async def on_ready(self):
-        if not self.rwapi:
-            self.rwapi = RobowebAPI(os.getenv("ROBOWEB_API_TOKEN"))
-        await self.reload_meetings(None)
-
-        max_retries = 15
-        retries = 0
-        retry_delay = 2
-        while retries <= max_retries:
-            logging.info(f"Attempting to connect to WebSocket (Attempt {retries + 1}/{max_retries})...")
-            try:
-                async with (connect(f"{os.getenv('WS_URL')}meeting/",
-                                    additional_headers={"Authorization": f"Token {os.getenv("ROBOWEB_API_TOKEN")}"},
-                                    user_agent_header=USER_AGENT + " New-Robomania-Bot")
-                            as websocket):
-                    self.ws = websocket
-                    logging.info("Connected to WebSocket successfully.")
-                    retries = 0
-                    retry_delay = 2
-                    while True:
-                        data = loads(await websocket.recv())
-                        # handle "initial_data" request
-                        if data["type"] == "meeting.request_initial_data":
-                            logging.info("Received initial data request.")
-                            await self.update_roles()
-                            await self.update_voice_channels()
-                            continue
-                        # don't send notifications for past meetings
-                        if "meeting" in data["type"] and "absent_request" not in data["type"]:
-                            start_time = datetime.datetime.fromisoformat(data["meeting"]["start_time"])
-                            if start_time < datetime.datetime.now(now_tz):
-                                continue
-                        if data["type"] in ("meeting.create", "meeting.edit"):
-                            is_edit = (data["type"] == 'meeting.edit')
-                            meeting = data["meeting"]
-                            meeting_id = meeting["id"]
-                            logging.info(
-                                f"Received new meeting {'edit' if is_edit else 'creation'} event "
-                                f"for meeting #{meeting_id}")
-                            embed = Embed(
-                                title="會議更新" if is_edit else "新會議",
-                                description=f"會議 `#{meeting_id}` 的資訊已更新。" if is_edit else f"已預定新的會議 `#{meeting_id}`。",
-                                color=default_color,
-                            )
-                            embed.add_field(name="名稱", value=meeting["name"], inline=False)
-                            mention_text = ""
-                            mention_list: list = meeting.get("discord_mentions", [])
-                            if "@everyone" in mention_list:
-                                mention_text = "所有人"
-                            else:
-                                for role in mention_list:
-                                    mention_text += f"<@&{role}> "
-                            if mention_text == "":
-                                mention_text = "所有人"
-                            embed.add_field(name="參加對象", value=mention_text, inline=False)
-                            if meeting["can_absent"]:
-                                embed.add_field(name="允許請假", value="成員可透過網頁面板請假。", inline=False)
-                            else:
-                                embed.add_field(name="不允許請假",
-                                                value="已停用此會議的請假功能。\n若無法參加會議，請直接與主幹聯絡。",
-                                                inline=False)
-                            host_discord_id = int(
-                                (await self.rwapi.get_member_info(meeting["host"], True))["discord_id"])
-                            embed.add_field(name="主持人", value=f"<@{host_discord_id}>", inline=False)
-                            embed.add_field(name="開始時間",
-                                            value=f"<t:{int(datetime.datetime.fromisoformat(
-                                                meeting['start_time']).timestamp())}:F>", inline=False)
-                            embed.add_field(name="地點", value=dc_location_format(meeting["location"]), inline=False)
-                            embed.set_footer(text="如要進行更多操作 (編輯、請假、審核假單)，請至網頁面板查看。")
-                            ch = self.bot.get_channel(NOTIFY_CHANNEL_ID)
-                            await ch.send(embed=embed, view=self.MeetingURLView(meeting_id))
-                            self.setup_tasks(meeting)
-                        elif data["type"] == "meeting.delete":
-                            meeting = data["meeting"]
-                            meeting_id = meeting["id"]
-                            logging.info(f"Received meeting deletion event for meeting #{meeting_id}")
-                            if meeting_id in MEETING_TASKS.keys():
-                                for _, task in MEETING_TASKS[meeting_id].items():
-                                    if task:
-                                        task.cancel()
-                                del MEETING_TASKS[meeting_id]
-                            embed = Embed(
-                                title="會議取消",
-                                description=f"會議 `#{meeting_id}` 已取消。",
-                                color=error_color,
-                            )
-                            embed.add_field(name="名稱", value=meeting["name"], inline=False)
-                            ch = self.bot.get_channel(NOTIFY_CHANNEL_ID)
-                            await ch.send(embed=embed)
-                        elif data["type"] == "meeting.new_absent_request":
-                            absent_request = data["absent_request"]
-                            pprint(absent_request)
-                            logging.info(f"Received new absent request event for request #{absent_request['id']}")
-                            member_discord_id = int(
-                                (await self.rwapi.get_member_info(absent_request["member"], True))["discord_id"]
-                            )
-                            meeting = await self.rwapi.get_meeting_info(absent_request["meeting"])
-                            embed = Embed(
-                                title="收到新的假單",
-                                description="有一筆新的假單，請至網頁面板進行審核。",
-                                color=default_color
-                            )
-                            embed.add_field(
-                                name="會議名稱及 ID",
-                                value=f"{meeting['name']} (`#{meeting['id']}`)",
-                                inline=False
-                            )
-                            embed.add_field(name="成員", value=f"<@{member_discord_id}>", inline=False)
-                            embed.add_field(name="請假事由", value=absent_request["reason"], inline=False)
-                            ch = self.bot.get_channel(ABSENT_REQ_CHANNEL_ID)
-                            await ch.send(embed=embed, view=self.MeetingURLView(meeting["id"]))
-                        elif data["type"] == "meeting.review_absent_request":
-                            absent_request = data["absent_request"]
-                            logging.info(f"Received absent request review event for request #{absent_request['id']}")
-                            status = {"approved": "✅ 批准", "rejected": "❌ 拒絕"}
-                            member_discord_id = int(
-                                (await self.rwapi.get_member_info(absent_request["member"], True))["discord_id"]
-                            )
-                            reviewer_discord_id = int(
-                                (await self.rwapi.get_member_info(absent_request["reviewer"], True))["discord_id"]
-                            )
-                            meeting = await self.rwapi.get_meeting_info(absent_request["meeting"])
-                            embed = Embed(title="假單審核結果", description="你的假單已經過主幹審核，結果如下：",
-                                          color=default_color)
-                            embed.add_field(name="會議名稱及 ID", value=f"{meeting['name']} (`#{meeting['id']}`)",
-                                            inline=False)
-                            embed.add_field(name="審核人員", value=f"<@{reviewer_discord_id}>", inline=False)
-                            embed.add_field(name="審核結果", value=status.get(absent_request["status"], "未知"),
-                                            inline=False)
-                            if absent_request.get("reviewer_comment", None):
-                                embed.add_field(name="審核意見", value=absent_request["reviewer_comment"], inline=False)
-                            embed.set_footer(text="若對審核結果有異議，請直接與主幹聯絡。")
-                            try:
-                                await self.bot.get_user(member_discord_id).send(embed=embed)
-                            except discord.Forbidden:
-                                logging.warning(
-                                    f"成員 {member_discord_id} 似乎關閉了陌生人私訊功能，因此無法傳送通知。"
-                                )
-                            except Exception as e:
-                                logging.error(
-                                    f"傳送私訊給成員 {member_discord_id} 時發生錯誤：{type(e).__name__}: {str(e)}")
-                        else:
-                            logging.info(f"Received unknown event: {data}")
-            except Exception as e:
-                retries += 1
-                retry_delay *= 2  # Exponential backoff
-                logging.error(f"An error occurred: {type(e).__name__}: {str(e)}. "
-                              f"Attempting to reconnect in {retry_delay} seconds...")
-                await asyncio.sleep(retry_delay)
-        logging.error("Max retries reached. Could not connect to WebSocket.")
-
-    def setup_tasks(self, meeting: dict):
-        meeting_id = meeting["id"]
+        try:
+            await self.reconcile_meetings()
+        except Exception as e:
+            logging.error(f"Failed to reconcile meeting tasks: {type(e).__name__}: {str(e)}")
+
+    async def reconcile_meetings(self):
+        """
+        Bring the restored meeting jobs in line with the panel, only touching meetings that were created, edited or
+        deleted while the bot was down.
+        """
+        await self.bot.scheduler.restored.wait()
+        upcoming = {meeting["id"]: meeting for meeting in await self.rwapi.get_upcoming_meetings()}
+        changed = 0
+        for meeting_id, meeting in upcoming.items():
+            job = (self.bot.scheduler.get(f"meeting:{meeting_id}:start")
+                   or self.bot.scheduler.get(f"meeting:{meeting_id}:notify"))
+            if job is not None and job.payload.raw == meeting:
+                continue
+            self.setup_tasks(MeetingPayload.from_dict(meeting))
+            changed += 1
+        now = datetime.datetime.now(now_tz).timestamp()
+        removed = self.bot.scheduler.cancel_where(
+            lambda job: job.kind in MEETING_JOB_KINDS and job.payload.id not in upcoming
+            and job.payload.start_time.timestamp() > now
+        )
+        logging.info(f"Reconciled meeting tasks: {changed} meeting(s) updated, {removed} task(s) removed")
+
+    @staticmethod
+    def is_past_meeting(event: Event) -> bool:
+        # don't send notifications for past meetings
+        return event.payload.start_time < datetime.datetime.now(now_tz)
+
+    async def on_request_initial_data(self, event: Event):
+        logging.info("Received initial data request.")
+        await self.update_roles()
+        await self.update_voice_channels()
+
+    async def on_meeting_create_or_edit(self, event: Event):
+        if self.is_past_meeting(event):
+            return
+        is_edit = (event.type == 'meeting.edit')
+        meeting: MeetingPayload = event.payload
+        meeting_id = meeting.id
+        logging.info(
+            f"Received new meeting {'edit' if is_edit else 'creation'} event "
+            f"for meeting #{meeting_id}")
+        embed = Embed(
+            title="會議更新" if is_edit else "新會議",
+            description=f"會議 `#{meeting_id}` 的資訊已更新。" if is_edit else f"已預定新的會議 `#{meeting_id}`。",
+            color=default_color,
+        )
+        embed.add_field(name="名稱", value=meeting.name, inline=False)
+        mention_text = ""
+        mention_list: list = meeting.discord_mentions
+        if "@everyone" in mention_list:
+            mention_text = "所有人"
+        else:
+            for role in mention_list:
+                mention_text += f"<@&{role}> "
+        if mention_text == "":
+            mention_text = "所有人"
+        embed.add_field(name="參加對象", value=mention_text, inline=False)
+        if meeting.can_absent:
+            embed.add_field(name="允許請假", value="成員可透過網頁面板請假。", inline=False)
+        else:
+            embed.add_field(name="不允許請假",
+                            value="已停用此會議的請假功能。\n若無法參加會議，請直接與主幹聯絡。",
+                            inline=False)
+        host_discord_id = int(
+            (await self.rwapi.get_member_info(meeting.host, True))["discord_id"])
+        embed.add_field(name="主持人", value=f"<@{host_discord_id}>", inline=False)
+        embed.add_field(name="開始時間", value=f"<t:{int(meeting.start_time.timestamp())}:F>", inline=False)
+        embed.add_field(name="地點", value=dc_location_format(meeting.location), inline=False)
+        embed.set_footer(text="如要進行更多操作 (編輯、請假、審核假單)，請至網頁面板查看。")
+        ch = self.bot.get_channel(NOTIFY_CHANNEL_ID)
+        await ch.send(embed=embed, view=self.MeetingURLView(meeting_id))
+        self.setup_tasks(meeting)
+
+    async def on_meeting_delete(self, event: Event):
+        if self.is_past_meeting(event):
+            return
+        meeting: MeetingPayload = event.payload
+        meeting_id = meeting.id
+        logging.info(f"Received meeting deletion event for meeting #{meeting_id}")
+        self.cancel_tasks(meeting_id)
+        embed = Embed(
+            title="會議取消",
+            description=f"會議 `#{meeting_id}` 已取消。",
+            color=error_color,
+        )
+        embed.add_field(name="名稱", value=meeting.name, inline=False)
+        ch = self.bot.get_channel(NOTIFY_CHANNEL_ID)
+        await ch.send(embed=embed)
+
+    async def on_new_absent_request(self, event: Event):
+        absent_request: AbsentRequestPayload = event.payload
+        logging.debug(f"New absent request: {absent_request}")
+        logging.info(f"Received new absent request event for request #{absent_request.id}")
+        member_discord_id = int(
+            (await self.rwapi.get_member_info(absent_request.member, True))["discord_id"]
+        )
+        meeting = await self.rwapi.get_meeting_info(absent_request.meeting)
+        embed = Embed(
+            title="收到新的假單",
+            description="有一筆新的假單，請至網頁面板進行審核。",
+            color=default_color
+        )
+        embed.add_field(
+            name="會議名稱及 ID",
+            value=f"{meeting['name']} (`#{meeting['id']}`)",
+            inline=False
+        )
+        embed.add_field(name="成員", value=f"<@{member_discord_id}>", inline=False)
+        embed.add_field(name="請假事由", value=absent_request.reason, inline=False)
+        ch = self.bot.get_channel(ABSENT_REQ_CHANNEL_ID)
+        await ch.send(embed=embed, view=self.MeetingURLView(meeting["id"]))
+        await self.refresh_prepared(absent_request.meeting)
+
+    async def on_review_absent_request(self, event: Event):
+        absent_request: AbsentRequestPayload = event.payload
+        logging.info(f"Received absent request review event for request #{absent_request.id}")
+        status = {"approved": "✅ 批准", "rejected": "❌ 拒絕"}
+        discord_ids = await self.rwapi.resolve_discord_ids((absent_request.member, absent_request.reviewer))
+        member_discord_id = discord_ids[absent_request.member]
+        reviewer_discord_id = discord_ids[absent_request.reviewer]
+        meeting = await self.rwapi.get_meeting_info(absent_request.meeting)
+        embed = Embed(title="假單審核結果", description="你的假單已經過主幹審核，結果如下：",
+                      color=default_color)
+        embed.add_field(name="會議名稱及 ID", value=f"{meeting['name']} (`#{meeting['id']}`)",
+                        inline=False)
+        embed.add_field(name="審核人員", value=f"<@{reviewer_discord_id}>", inline=False)
+        embed.add_field(name="審核結果", value=status.get(absent_request.status, "未知"),
+                        inline=False)
+        if absent_request.reviewer_comment:
+            embed.add_field(name="審核意見", value=absent_request.reviewer_comment, inline=False)
+        embed.set_footer(text="若對審核結果有異議，請直接與主幹聯絡。")
+        try:
+            await self.bot.get_user(member_discord_id).send(embed=embed)
+        except discord.Forbidden:
+            logging.warning(
+                f"成員 {member_discord_id} 似乎關閉了陌生人私訊功能，因此無法傳送通知。"
+            )
+        except Exception as e:
+            logging.error(
+                f"傳送私訊給成員 {member_discord_id} 時發生錯誤：{type(e).__name__}: {str(e)}")
+        # the notices list pending / approved absentees
+        await self.refresh_prepared(absent_request.meeting)
+
+    def setup_tasks(self, meeting: MeetingPayload):
+        meeting_id = meeting.id
         logging.debug(f"Setting up tasks for meeting #{meeting_id}")
-        if meeting_id in MEETING_TASKS.keys():
-            for task_type, task in MEETING_TASKS[meeting_id].items():
-                if task:
-                    logging.debug(f"(#{meeting_id:2d}) Cancelling existing \"{task_type}\" task")
-                    task.cancel()
-        start_time = datetime.datetime.fromisoformat(meeting["start_time"]).replace(tzinfo=now_tz)
-        notify_time_offset = datetime.timedelta(seconds=float(meeting.get("discord_notify_time", "300")))
-        notify_time = start_time - notify_time_offset
-        if notify_time < datetime.datetime.now(now_tz):
-            logging.debug(f"(#{meeting_id:2d}) Notify time has passed, setting to 10 seconds from now")
-            notify_time = datetime.datetime.now(now_tz) + datetime.timedelta(seconds=10)
+        # anything rendered for the old version of the meeting is out of date
+        self.discard_prepared(meeting_id)
+        now = datetime.datetime.now(now_tz)
+        notify_time = meeting.notify_time
+        if notify_time < now:
+            logging.debug(f"(#{meeting_id:2d}) Notify time has passed, notifying now")
         logging.debug(f"(#{meeting_id:2d}) Notify time set to {notify_time.isoformat()}")
-        start_time = datetime.datetime.fromisoformat(meeting["start_time"]).replace(tzinfo=now_tz)
-        MEETING_TASKS[meeting_id] = {
-            "notify": tasks.Loop(
-                coro=self.notify_meeting,
-                seconds=tasks.MISSING,
-                minutes=tasks.MISSING,
-                hours=tasks.MISSING,
-                time=notify_time.timetz(),
-                count=None,
-                reconnect=True,
-                loop=self.bot.loop,
-            ),
-            "start": tasks.Loop(
-                coro=self.notify_start_meeting,
-                seconds=tasks.MISSING,
-                minutes=tasks.MISSING,
-                hours=tasks.MISSING,
-                time=start_time.timetz(),
-                count=None,
-                reconnect=True,
-                loop=self.bot.loop,
-            ),
-        }
-        MEETING_TASKS[meeting_id]["notify"].start(meeting)
-        MEETING_TASKS[meeting_id]["start"].start(meeting)
+        # scheduling replaces any existing job of this meeting
+        self.schedule_notice(meeting, "notify", notify_time)
+        if meeting.start_time >= now:
+            self.schedule_notice(meeting, "start", meeting.start_time)
+        else:
+            self.bot.scheduler.cancel(f"meeting:{meeting_id}:start")
+            self.bot.scheduler.cancel(f"meeting:{meeting_id}:prepare_start")
+        check_time = meeting.start_time + ATTENDANCE_GRACE
+        if dc_channel_id(meeting.location) is not None and check_time >= now:
+            self.bot.scheduler.schedule(f"meeting:{meeting_id}:attendance", check_time, "meeting.attendance", meeting)
+        else:
+            self.bot.scheduler.cancel(f"meeting:{meeting_id}:attendance")
         return notify_time
 
-    async def notify_meeting(self, meeting: dict):
-        start_time = datetime.datetime.fromisoformat(meeting["start_time"]).astimezone(now_tz)
-        notify_time_offset = datetime.timedelta(seconds=float(meeting.get("discord_notify_time", "300")))
-        notify_time = start_time - notify_time_offset
-        if notify_time - datetime.datetime.now(now_tz) > datetime.timedelta(seconds=1000):
-            return
+    def schedule_notice(self, meeting: MeetingPayload, notice_type: str, when: datetime.datetime):
+        # render the notice (absent requests, members, embeds) shortly before it is due, so that only the send
+        # is left when the time comes
+        prepare_time = when - PREPARE_AHEAD
+        if prepare_time > datetime.datetime.now(now_tz):
+            self.bot.scheduler.schedule(f"meeting:{meeting.id}:prepare_{notice_type}", prepare_time,
+                                        f"meeting.prepare_{notice_type}", meeting)
+        else:
+            # too close to prepare ahead; the notice is rendered when it is sent
+            self.bot.scheduler.cancel(f"meeting:{meeting.id}:prepare_{notice_type}")
+        self.bot.scheduler.schedule(f"meeting:{meeting.id}:{notice_type}", when, f"meeting.{notice_type}", meeting)
+
+    def cancel_tasks(self, meeting_id: int):
+        self.discard_prepared(meeting_id)
+        for task_type in ("prepare_notify", "notify", "prepare_start", "start", "attendance"):
+            if self.bot.scheduler.cancel(f"meeting:{meeting_id}:{task_type}"):
+                logging.debug(f"(#{meeting_id:2d}) Cancelled existing \"{task_type}\" task")
+
+    def discard_prepared(self, meeting_id: int):
+        for notice_type in ("notify", "start"):
+            self.prepared.pop((meeting_id, notice_type), None)
+
+    async def refresh_prepared(self, meeting_id: int):
+        """
+        Re-render notices of ``meeting_id`` that were already prepared, e.g. after its absent requests changed.
+        """
+        for notice_type in ("notify", "start"):
+            prepared = self.prepared.get((meeting_id, notice_type))
+            if prepared is None:
+                continue
+            try:
+                await self.prepare_notice(prepared.meeting, notice_type)
+            except Exception as e:
+                # fall back to rendering it when it's sent
+                self.prepared.pop((meeting_id, notice_type), None)
+                logging.error(f"(#{meeting_id:2d}) Failed to re-render \"{notice_type}\" notice: "
+                              f"{type(e).__name__}: {str(e)}")
+
+    async def prepare_notice(self, meeting: MeetingPayload, notice_type: str) -> PreparedNotice:
+        if notice_type == "notify":
+            prepared = await self.render_notify_meeting(meeting)
+        else:
+            prepared = await self.render_start_meeting(meeting)
+        self.prepared[(meeting.id, notice_type)] = prepared
+        logging.debug(f"(#{meeting.id:2d}) Prepared \"{notice_type}\" notice")
+        return prepared
+
+    async def prepare_notify_meeting(self, meeting: MeetingPayload):
+        await self.prepare_notice(meeting, "notify")
+
+    async def prepare_start_meeting(self, meeting: MeetingPayload):
+        await self.prepare_notice(meeting, "start")
+
+    async def take_prepared(self, meeting: MeetingPayload, notice_type: str, due: datetime.datetime) -> PreparedNotice:
+        prepared = self.prepared.pop((meeting.id, notice_type), None)
+        if prepared is not None and prepared.meeting.raw != meeting.raw:
+            # rendered from an older version of the meeting (edited while the prepare job was running)
+            logging.info(f"(#{meeting.id:2d}) Prepared \"{notice_type}\" notice is outdated; discarding it")
+            prepared = None
+        if prepared is None:
+            # not prepared in time (e.g. just scheduled, or the bot restarted); render it now
+            logging.info(f"(#{meeting.id:2d}) \"{notice_type}\" notice wasn't prepared in advance; rendering it now")
+            prepared = await self.prepare_notice(meeting, notice_type)
+            self.prepared.pop((meeting.id, notice_type), None)
+        delay = (datetime.datetime.now(now_tz) - due).total_seconds()
+        logging.debug(f"(#{meeting.id:2d}) Sending \"{notice_type}\" notice {delay * 1000:.0f} ms after it was due")
+        return prepared
+
+    async def render_notify_meeting(self, meeting: MeetingPayload) -> PreparedNotice:
+        start_time = meeting.start_time
         embed = Embed(
             title="會議即將開始！",
-            description=f"會議**「{meeting['name']}」**(`#{meeting['id']}`) 即將於 "
+            description=f"會議**「{meeting.name}」**(`#{meeting.id}`) 即將於 "
                         f"<t:{int(start_time.timestamp())}:R> 開始！",
             color=default_color,
         )
-        if meeting["description"] != "":
+        if meeting.description != "":
             embed.add_field(
                 name="簡介",
-                value=meeting["description"],
+                value=meeting.description,
                 inline=False,
             )
-        embed.add_field(name="地點", value=dc_location_format(meeting["location"]), inline=False)
-        ch = self.bot.get_channel(NOTIFY_CHANNEL_ID)
+        embed.add_field(name="地點", value=dc_location_format(meeting.location), inline=False)
         mention_text = ""
-        mention_list: list = meeting.get("discord_mentions", [])
+        mention_list: list = meeting.discord_mentions
         if "@everyone" in mention_list:
             mention_text = "@everyone"
         else:
@@ -401,75 +569,142 @@ class Meeting(commands.Cog):
                 mention_text += f"<@&{role}> "
         if mention_text == "":
             mention_text = "@everyone"
-        await ch.send(content=mention_text, embed=embed)
-        absent_requests = await self.rwapi.get_absent_requests(meeting_id=meeting["id"])
+        absent_requests = await self.rwapi.get_absent_requests(meeting_id=meeting.id)
+        absent_requests = [req for req in absent_requests if req["status"] in ("pending", "rejected")]
+        discord_ids = await self.rwapi.resolve_discord_ids(req["member"] for req in absent_requests)
+        messages = {}
         for absent_request in absent_requests:
-            if absent_request["status"] in ("pending", "rejected"):
-                member_discord_id = int(
-                    (await self.rwapi.get_member_info(absent_request["member"], True))["discord_id"]
-                )
-                embed = Embed(
-                    title="請準時參加會議",
-                    description="你的假單因 "
-                                f"**{'尚未經過審核' if absent_request['status'] == 'pending' else '未通過審核'}**"
-                                "，因此仍需準時出席會議。\n"
-                                "如因故無法參加會議，請立即告知主幹。",
-                    color=default_color,
-                )
-                embed.add_field(name="會議名稱及 ID", value=f"{meeting['name']} (`#{meeting['id']}`)", inline=False)
-                embed.add_field(
-                    name="開始時間", value=f"<t:{int(start_time.timestamp())}:R>", inline=False
-                )
-                try:
-                    await self.bot.get_user(member_discord_id).send(embed=embed)
-                except discord.Forbidden:
-                    logging.warning(
-                        f"成員 {member_discord_id} 似乎關閉了陌生人私訊功能，因此無法傳送通知。"
-                    )
-                except Exception as e:
-                    logging.error(f"傳送私訊給成員 {member_discord_id} 時發生錯誤：{type(e).__name__}: {str(e)}")
-        MEETING_TASKS[meeting["id"]]["notify"].stop()
-        del MEETING_TASKS[meeting["id"]]["notify"]
-
-    async def notify_start_meeting(self, meeting: dict):
-        start_time = datetime.datetime.fromisoformat(meeting["start_time"])
-        if start_time - datetime.datetime.now(now_tz) > datetime.timedelta(seconds=1000):
-            return
+            member_discord_id = discord_ids.get(absent_request["member"])
+            if member_discord_id is None:
+                logging.warning(f"無法取得成員 #{absent_request['member']} 的 Discord ID，因此無法傳送通知。")
+                continue
+            dm_embed = Embed(
+                title="請準時參加會議",
+                description="你的假單因 "
+                            f"**{'尚未經過審核' if absent_request['status'] == 'pending' else '未通過審核'}**"
+                            "，因此仍需準時出席會議。\n"
+                            "如因故無法參加會議，請立即告知主幹。",
+                color=default_color,
+            )
+            dm_embed.add_field(name="會議名稱及 ID", value=f"{meeting.name} (`#{meeting.id}`)", inline=False)
+            dm_embed.add_field(
+                name="開始時間", value=f"<t:{int(start_time.timestamp())}:R>", inline=False
+            )
+            messages[member_discord_id] = {"embed": dm_embed}
+        return PreparedNotice(meeting=meeting, content=mention_text, embed=embed, dm_messages=messages)
+
+    async def notify_meeting(self, meeting: MeetingPayload):
+        prepared = await self.take_prepared(meeting, "notify", meeting.notify_time)
+        ch = self.bot.get_channel(NOTIFY_CHANNEL_ID)
+        await ch.send(content=prepared.content, embed=prepared.embed)
+        if prepared.dm_messages:
+            report = await self.bot.dm_delivery.send_many(prepared.dm_messages)
+            logging.info(f"會議 #{meeting.id} 的出席提醒私訊：{report.summary()}")
+
+    async def render_start_meeting(self, meeting: MeetingPayload) -> PreparedNotice:
+        start_time = meeting.start_time
         embed = Embed(
             title="會議開始！",
-            description=f"會議**「{meeting['name']}」**(`#{meeting['id']}`) 已經在 "
+            description=f"會議**「{meeting.name}」**(`#{meeting.id}`) 已經在 "
                         f"<t:{int(start_time.timestamp())}:F> 開始！",
             color=default_color,
         )
-        if meeting["description"] != "":
+        if meeting.description != "":
             embed.add_field(
                 name="簡介",
-                value=meeting["description"],
+                value=meeting.description,
                 inline=False,
             )
-        host_discord_id = (await self.rwapi.get_member_info(meeting["host"], True))["discord_id"]
+        absent_requests = await self.rwapi.get_absent_requests(meeting_id=meeting.id)
+        approved_members = [req["member"] for req in absent_requests if req.get("status") == "approved"]
+        members = await self.rwapi.get_members_bulk([meeting.host, *approved_members])
+        host_discord_id = members[meeting.host]["discord_id"]
         embed.add_field(name="主持人", value=f"<@{host_discord_id}>", inline=False)
-        embed.add_field(name="地點", value=dc_location_format(meeting["location"]), inline=False)
-        absent_requests = await self.rwapi.get_absent_requests(meeting_id=meeting["id"])
+        embed.add_field(name="地點", value=dc_location_format(meeting.location), inline=False)
         absent_request_str = ""
-        for absent_request in absent_requests:
-            if absent_request.get("status") == "approved":
-                member = await self.rwapi.get_member_info(absent_request["member"], True)
+        for member_id in approved_members:
+            member = members.get(member_id)
+            if member:
                 absent_request_str += f"<@{member['discord_id']}>({member['real_name']})\n"
         if absent_request_str != "":
             embed.add_field(name="請假人員", value=absent_request_str, inline=False)
-        ch = self.bot.get_channel(NOTIFY_CHANNEL_ID)
         mention_text = ""
-        mention_list: list = meeting.get("discord_mentions", [])
+        mention_list: list = meeting.discord_mentions
         if "@everyone" in mention_list:
             mention_text = "@everyone"
         else:
             for role in mention_list:
                 mention_text += f"<@&{role}> "
-        if mention_text != "":
-            await ch.send(content=mention_text, embed=embed)
-        MEETING_TASKS[meeting["id"]]["start"].stop()
-        del MEETING_TASKS[meeting["id"]]["start"]
+        return PreparedNotice(meeting=meeting, content=mention_text, embed=embed)
+
+    async def notify_start_meeting(self, meeting: MeetingPayload):
+        prepared = await self.take_prepared(meeting, "start", meeting.start_time)
+        ch = self.bot.get_channel(NOTIFY_CHANNEL_ID)
+        if prepared.content != "":
+            await ch.send(content=prepared.content, embed=prepared.embed)
+
+    def expected_attendees(self, meeting: MeetingPayload) -> set[int]:
+        guild: discord.Guild = self.bot.guilds[0]
+        mention_list: list = meeting.discord_mentions
+        if not mention_list or "@everyone" in mention_list:
+            return {member.id for member in guild.members if not member.bot}
+        expected = set()
+        for role_id in mention_list:
+            role = guild.get_role(int(role_id))
+            if role is not None:
+                expected.update(member.id for member in role.members if not member.bot)
+        return expected
+
+    @staticmethod
+    def format_attendees(discord_ids: list[int]) -> str:
+        text = ""
+        for discord_id in discord_ids:
+            mention = f"<@{discord_id}> "
+            if len(text) + len(mention) > 1000:
+                return text + f"…等 {len(discord_ids)} 人"
+            text += mention
+        return text or "無"
+
+    async def report_attendance(self, meeting: MeetingPayload):
+        channel_id = dc_channel_id(meeting.location)
+        if channel_id is None:
+            return
+        present = self.bot.voice_roster.present_since(channel_id, meeting.start_time.timestamp())
+        absent_requests = await self.rwapi.get_absent_requests(meeting_id=meeting.id)
+        approved_members = [req["member"] for req in absent_requests if req.get("status") == "approved"]
+        discord_ids = await self.rwapi.resolve_discord_ids(approved_members)
+        approved_absent = set(discord_ids.values()) - present.keys()
+        missing = self.expected_attendees(meeting) - present.keys() - approved_absent
+        present_ids = sorted(present, key=present.get)
+        logging.info(f"(#{meeting.id:2d}) Attendance: {len(present_ids)} present, {len(approved_absent)} "
+                     f"approved absent, {len(missing)} missing")
+        embed = Embed(
+            title="會議出席報告",
+            description=f"會議**「{meeting.name}」**(`#{meeting.id}`) 開始後 "
+                        f"{int(ATTENDANCE_GRACE.total_seconds() // 60)} 分鐘的出席狀況 (<#{channel_id}>)：",
+            color=default_color,
+        )
+        embed.add_field(name=f"出席 ({len(present_ids)})", value=self.format_attendees(present_ids), inline=False)
+        embed.add_field(name=f"已請假 ({len(approved_absent)})", value=self.format_attendees(sorted(approved_absent)),
+                        inline=False)
+        embed.add_field(name=f"未出席 ({len(missing)})", value=self.format_attendees(sorted(missing)), inline=False)
+        ch = self.bot.get_channel(ABSENT_REQ_CHANNEL_ID)
+        await ch.send(embed=embed, view=self.MeetingURLView(meeting.id))
+
+        def with_member_ids(ids) -> list[dict]:
+            result = []
+            for discord_id in ids:
+                record = self.rwapi.member_index.get_by_discord_id(discord_id)
+                result.append({"discord_id": discord_id, "member": record["id"] if record else None})
+            return result
+
+        await self.bot.ws_manager.send("meeting", {
+            "type": "meeting.attendance",
+            "meeting_id": meeting.id,
+            "present": with_member_ids(present_ids),
+            "approved_absent": with_member_ids(sorted(approved_absent)),
+            "missing": with_member_ids(sorted(missing)),
+        }, coalesce_key=f"meeting.attendance:{meeting.id}")
 
     MEETING_CMDS = discord.SlashCommandGroup("meeting")
 
@@ -596,12 +831,9 @@ class Meeting(commands.Cog):
     async def reload_meetings(self, ctx: ApplicationContext = None):
         try:
             upcoming_meetings = await self.rwapi.get_upcoming_meetings()
-            for meeting_id in MEETING_TASKS.keys():
-                for _, task in MEETING_TASKS[meeting_id].items():
-                    if task is not None:
-                        task.cancel()
-            MEETING_TASKS.clear()
-            for meeting in upcoming_meetings:
+            self.bot.scheduler.cancel_where(lambda job: job.kind in MEETING_JOB_KINDS)
+            self.prepared.clear()
+            for meeting in map(MeetingPayload.from_dict, upcoming_meetings):
                 self.setup_tasks(meeting)
             embed = Embed(title="成功：已重新載入會議提醒",
                           description="已重新載入所有未來的會議提醒。",
@@ -6,11 +6,10 @@ import os
 import zoneinfo
 from pathlib import Path
 import logging
-from websockets.asyncio.client import connect, USER_AGENT
-import asyncio
-from json import loads
+import heapq
 
 from roboweb_api import RobowebAPI
+from ws_events import Event, WarningDetailPayload
 
 base_dir = os.path.abspath(os.path.dirname(__file__))
 parent_dir = str(Path(__file__).parent.parent.absolute())
@@ -19,67 +18,48 @@ default_color = 0x012a5e
 error_color = 0xF1411C
 
 
+async def aenumerate(aiterable, start: int = 0):
+    idx = start
+    async for item in aiterable:
+        yield idx, item
+        idx += 1
+
+
 class Member(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.rwapi: RobowebAPI | None = None
+        self.rwapi: RobowebAPI = bot.rwapi
+        bot.ws_manager.register("member", "member.add_warning_points", self.on_add_warning_points)
 
-    @commands.Cog.listener()
-    async def on_ready(self):
-        if not self.rwapi:
-            self.rwapi = RobowebAPI(os.getenv("ROBOWEB_API_TOKEN"))
+    def cog_unload(self):
+        self.bot.ws_manager.unregister(self)
 
-        max_retries = 15
-        retries = 0
-        retry_delay = 2
-        while retries <= max_retries:
-            logging.info(f"Attempting to connect to WebSocket (Attempt {retries + 1}/{max_retries})...")
-            try:
-                async with (connect(f"{os.getenv('WS_URL')}member/",
-                                    additional_headers={"Authorization": f"Token {os.getenv("ROBOWEB_API_TOKEN")}"},
-                                    user_agent_header=USER_AGENT + " New-Robomania-Bot")
-                            as websocket):
-                    logging.info("Connected to WebSocket successfully.")
-                    retries = 0
-                    retry_delay = 2
-                    while True:
-                        data = loads(await websocket.recv())
-                        if data["type"] == "member.add_warning_points":
-                            warning_detail = data["warning_detail"]
-                            logging.info(f"Received warning points event for #{warning_detail['id']}")
-                            member_discord_id = int((await self.rwapi.get_member_info(
-                                warning_detail["member"], True))["discord_id"])
-                            operator_discord_id = int((await self.rwapi.get_member_info(
-                                warning_detail["operator"], True))["discord_id"])
-                            current_points = (
-                                await self.rwapi.get_member_info(warning_detail["member"]))["warning_points"]
-                            is_positive = warning_detail["points"] < 0
-                            embed = Embed(
-                                title=f"{'銷點' if is_positive else '記點'}通知",
-                                description=f"剛才有主幹對你進行了 **{'銷點' if is_positive else '記點'}** 操作，資料如下：",
-                                color=default_color
-                            )
-                            embed.add_field(name="點數", value=f"`{warning_detail['points']}` 點", inline=False)
-                            embed.add_field(name="操作後點數", value=f"`{current_points}` 點", inline=False)
-                            embed.add_field(name="操作者", value=f"<@{operator_discord_id}>", inline=False)
-                            embed.add_field(name="事由", value=warning_detail["reason"], inline=False)
-                            if warning_detail["notes"]:
-                                embed.add_field(name="附註", value=warning_detail["notes"], inline=False)
-                            embed.set_footer(text="若有任何疑問，請立即聯絡主幹。")
-                            user = self.bot.get_user(member_discord_id)
-                            try:
-                                await user.send(embed=embed)
-                            except Exception as e:
-                                logging.error(f"無法傳送訊息給 {member_discord_id}: {e}")
-                        else:
-                            logging.info(f"Received unknown event: {data}")
-            except Exception as e:
-                retries += 1
-                retry_delay *= 2  # Exponential backoff
-                logging.error(f"An error occurred: {type(e).__name__}: {str(e)}. "
-                              f"Attempting to reconnect in {retry_delay} seconds...")
-                await asyncio.sleep(retry_delay)
-        logging.error("Max retries reached. Could not connect to WebSocket.")
+    async def on_add_warning_points(self, event: Event):
+        warning_detail: WarningDetailPayload = event.payload
+        logging.info(f"Received warning points event for #{warning_detail.id}")
+        discord_ids = await self.rwapi.resolve_discord_ids((warning_detail.member, warning_detail.operator))
+        member_discord_id = discord_ids[warning_detail.member]
+        operator_discord_id = discord_ids[warning_detail.operator]
+        current_points = (
+            await self.rwapi.get_member_info(warning_detail.member))["warning_points"]
+        is_positive = warning_detail.points < 0
+        embed = Embed(
+            title=f"{'銷點' if is_positive else '記點'}通知",
+            description=f"剛才有主幹對你進行了 **{'銷點' if is_positive else '記點'}** 操作，資料如下：",
+            color=default_color
+        )
+        embed.add_field(name="點數", value=f"`{warning_detail.points}` 點", inline=False)
+        embed.add_field(name="操作後點數", value=f"`{current_points}` 點", inline=False)
+        embed.add_field(name="操作者", value=f"<@{operator_discord_id}>", inline=False)
+        embed.add_field(name="事由", value=warning_detail.reason, inline=False)
+        if warning_detail.notes:
+            embed.add_field(name="附註", value=warning_detail.notes, inline=False)
+        embed.set_footer(text="若有任何疑問，請立即聯絡主幹。")
+        user = self.bot.get_user(member_discord_id)
+        try:
+            await user.send(embed=embed)
+        except Exception as e:
+            logging.error(f"無法傳送訊息給 {member_discord_id}: {e}")
 
     MEMBER_CMD = discord.SlashCommandGroup(name="member", description="隊員資訊相關指令。")
 
@@ -115,20 +95,25 @@ class Member(commands.Cog):
 
     @MEMBER_CMD.command(name="查詢記點人員", description="列出點數不為 0 的隊員。")
     async def member_list_bad_guys(self, ctx: discord.ApplicationContext):
+        # stream the list and keep only the top 25 in a bounded heap; ties keep the API's order
+        top_members = []
         try:
-            members = await self.rwapi.get_bad_guys()
+            async for idx, member in aenumerate(self.rwapi.iter_bad_guys()):
+                item = (member["warning_points"], -idx, member)
+                if len(top_members) < 25:
+                    heapq.heappush(top_members, item)
+                elif item[:2] > top_members[0][:2]:
+                    heapq.heapreplace(top_members, item)
         except Exception as e:
             embed = Embed(title="錯誤", description="發生未知錯誤。", color=error_color)
             embed.add_field(name="錯誤訊息", value=f"```{type(e).__name__}: {e}```", inline=False)
             await ctx.respond(embed=embed, ephemeral=True)
             return
+        members = [member for _, _, member in sorted(top_members, key=lambda x: x[:2], reverse=True)]
         if len(members) == 0:
             embed = Embed(title="無記點隊員", description="目前沒有隊員被記點。", color=default_color)
             await ctx.respond(embed=embed)
         else:
-            members.sort(key=lambda x: x["warning_points"], reverse=True)
-            if len(members) > 25:
-                members = members[:25]
             embed = Embed(title="遭記點隊員清單", description=f"以下為點數不為 0 的前 {len(members)} 名隊員：",
                           color=default_color)
             for idx, member in enumerate(members):
@@ -24,12 +24,7 @@ VERIFICATION_CHANNEL_ID = 1114444831054376971
 class NewVerification(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.rwapi = None
-
-    @commands.Cog.listener()
-    async def on_ready(self):
-        if not self.rwapi:
-            self.rwapi = RobowebAPI(os.getenv("ROBOWEB_API_TOKEN"))
+        self.rwapi: RobowebAPI = bot.rwapi
 
     class Step1(View):
         def __init__(self, outer_instance):
@@ -0,0 +1,113 @@
+# coding=utf-8
+import asyncio
+import logging
+import os
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+
+import discord
+
+
+@dataclass(slots=True)
+class DeliveryReport:
+    # recipient's Discord ID -> "sent", "forbidden" (DMs closed), "not_found" or "failed"
+    outcomes: dict[int, str] = field(default_factory=dict)
+    # recipient's Discord ID -> error message, for "failed" recipients
+    errors: dict[int, str] = field(default_factory=dict)
+    elapsed: float = 0.0
+
+    @property
+    def counts(self) -> Counter:
+        return Counter(self.outcomes.values())
+
+    def summary(self) -> str:
+        counts = self.counts
+        return (f"成功 {counts['sent']}、關閉私訊 {counts['forbidden']}、找不到使用者 {counts['not_found']}、"
+                f"失敗 {counts['failed']} (共 {len(self.outcomes)} 人，耗時 {self.elapsed:.1f} 秒)")
+
+
+class DMDelivery:
+    """
+    Sends DMs to many members at once.
+
+    Sends run concurrently, capped by a semaphore shared by every fan-out so that bursts stay well below Discord's
+    global rate limit; per-route buckets (one per DM channel) are handled by py-cord's HTTP client. 429 and 5xx
+    responses that still get through are retried with backoff, and every recipient's outcome is collected in a
+    DeliveryReport.
+    """
+    # default; DM_CONCURRENCY overrides it when the engine is created
+    CONCURRENCY = 8
+    MAX_RETRIES = 3
+    RETRY_BASE_DELAY = 1
+    RETRY_MAX_DELAY = 30
+
+    def __init__(self, bot: discord.Client):
+        self.bot = bot
+        # read here rather than at import time, so that settings loaded from TOKEN.env by main.py apply
+        self.CONCURRENCY = int(os.getenv("DM_CONCURRENCY", str(self.CONCURRENCY)))
+        self.semaphore = asyncio.Semaphore(self.CONCURRENCY)
+
+    async def _get_user(self, user_id: int) -> discord.User:
+        user = self.bot.get_user(user_id)
+        if user is None:
+            user = await self.bot.fetch_user(user_id)
+        return user
+
+    def _retry_delay(self, e: discord.HTTPException, attempt: int) -> float:
+        if e.status == 429 and e.response is not None:
+            retry_after = e.response.headers.get("Retry-After")
+            if retry_after is not None:
+                try:
+                    return min(self.RETRY_MAX_DELAY, float(retry_after))
+                except ValueError:
+                    pass
+        # full jitter
+        return random.uniform(0, min(self.RETRY_MAX_DELAY, self.RETRY_BASE_DELAY * 2 ** attempt))
+
+    async def send(self, user_id: int, **kwargs) -> tuple[str, str | None]:
+        """
+        Send a DM to ``user_id``; ``kwargs`` are passed to ``User.send``.
+        :return: The outcome ("sent", "forbidden", "not_found" or "failed") and, for failures, the error.
+        """
+        async with self.semaphore:
+            for attempt in range(self.MAX_RETRIES + 1):
+                try:
+                    user = await self._get_user(user_id)
+                    await user.send(**kwargs)
+                    return "sent", None
+                except discord.Forbidden:
+                    return "forbidden", None
+                except discord.NotFound:
+                    return "not_found", None
+                except discord.HTTPException as e:
+                    if (e.status == 429 or e.status >= 500) and attempt < self.MAX_RETRIES:
+                        delay = self._retry_delay(e, attempt)
+                        logging.debug(f"DM to {user_id} got HTTP {e.status}; retrying in {delay:.1f} seconds")
+                        await asyncio.sleep(delay)
+                        continue
+                    return "failed", f"{type(e).__name__}: {str(e)}"
+                except Exception as e:
+                    return "failed", f"{type(e).__name__}: {str(e)}"
+        return "failed", "retries exhausted"
+
+    async def send_many(self, messages: dict[int, dict]) -> DeliveryReport:
+        """
+        Send a DM to every recipient concurrently.
+        :param messages: Recipient's Discord ID -> keyword arguments for ``User.send``.
+        """
+        start = time.perf_counter()
+        user_ids = list(messages.keys())
+        results = await asyncio.gather(*(self.send(user_id, **messages[user_id]) for user_id in user_ids))
+        report = DeliveryReport(elapsed=time.perf_counter() - start)
+        for user_id, (outcome, error) in zip(user_ids, results):
+            report.outcomes[user_id] = outcome
+            if outcome == "forbidden":
+                logging.warning(f"成員 {user_id} 似乎關閉了陌生人私訊功能，因此無法傳送通知。")
+            elif outcome == "not_found":
+                logging.warning(f"找不到使用者 {user_id}，因此無法傳送通知。")
+            elif outcome == "failed":
+                report.errors[user_id] = error
+                logging.error(f"傳送私訊給成員 {user_id} 時發生錯誤：{error}")
+        return report
@@ -0,0 +1,81 @@
+# coding=utf-8
+import asyncio
+import sqlite3
+import time
+
+from serial_executor import SerialExecutor
+
+
+class JobStore:
+    """
+    SQLite record of the Scheduler's jobs and their status (pending, running, done, failed, cancelled, missed),
+    so that scheduled jobs survive a restart.
+
+    Every read and write runs on one background thread, in the order it was submitted, so callers on the event
+    loop never block on disk and a later write (e.g. a cancel) can't overtake an earlier one.
+    """
+    ACTIVE_STATUSES = ("pending", "running")
+
+    def __init__(self, path: str = "scheduler.sqlite3"):
+        self.path = path
+        self._executor = SerialExecutor("job-store", "Job store")
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "key TEXT PRIMARY KEY, "
+                "kind TEXT NOT NULL, "
+                "deadline REAL NOT NULL, "
+                "payload TEXT NOT NULL, "
+                "status TEXT NOT NULL, "
+                "updated_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, updated_at)")
+
+    def _save(self, key: str, kind: str, deadline: float, payload: str):
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jobs (key, kind, deadline, payload, status, updated_at) "
+                "VALUES (?, ?, ?, ?, 'pending', ?)",
+                (key, kind, deadline, payload, time.time()),
+            )
+
+    def save(self, key: str, kind: str, deadline: float, payload: str):
+        """Record a (re)scheduled job as pending."""
+        self._executor.submit(self._save, key, kind, deadline, payload)
+
+    def _set_status(self, keys: list[str], status: str):
+        with self._conn:
+            self._conn.executemany(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE key = ?",
+                [(status, time.time(), key) for key in keys],
+            )
+
+    def set_status(self, keys: str | list[str], status: str):
+        self._executor.submit(self._set_status, [keys] if isinstance(keys, str) else list(keys), status)
+
+    def _load_active(self, retention: float) -> list[tuple[str, str, float, str]]:
+        with self._conn:
+            # finished jobs are only kept for a while, for troubleshooting
+            self._conn.execute(
+                f"DELETE FROM jobs WHERE status NOT IN ({', '.join('?' * len(self.ACTIVE_STATUSES))}) "
+                f"AND updated_at < ?",
+                (*self.ACTIVE_STATUSES, time.time() - retention),
+            )
+        return self._conn.execute(
+            f"SELECT key, kind, deadline, payload FROM jobs "
+            f"WHERE status IN ({', '.join('?' * len(self.ACTIVE_STATUSES))}) ORDER BY deadline",
+            self.ACTIVE_STATUSES,
+        ).fetchall()
+
+    async def load_active(self, retention: float = 7 * 86400) -> list[tuple[str, str, float, str]]:
+        """
+        Jobs that haven't finished, as (key, kind, deadline, payload) rows. Finished jobs older than ``retention``
+        seconds are deleted.
+        """
+        return await asyncio.wrap_future(self._executor.submit(self._load_active, retention))
+
+    def close(self):
+        # wait for queued writes before closing the connection
+        self._executor.shutdown()
+        self._conn.close()
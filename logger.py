@@ -1,22 +1,152 @@
 # coding=utf-8
+import atexit
+import datetime
+import json
 import logging
-from colorlog import ColoredFormatter
 import os
-import datetime
+import queue
 import zoneinfo
+from logging.handlers import BaseRotatingHandler, QueueHandler, QueueListener
+
+from colorlog import ColoredFormatter
 
 
 base_dir = os.path.abspath(os.path.dirname(__file__))
 now_tz = zoneinfo.ZoneInfo("Asia/Taipei")
 
 
+def parse_levels(spec: str) -> dict[str, int]:
+    """
+    Parse per-module levels such as ``"discord=INFO,aiohttp.access=WARNING"`` into logger name -> level.
+    """
+    levels = {}
+    for item in spec.split(","):
+        if "=" not in item:
+            continue
+        name, level = (part.strip() for part in item.split("=", 1))
+        value = int(level) if level.isdigit() else logging.getLevelName(level.upper())
+        if not isinstance(value, int):
+            raise ValueError(f"Unknown log level for {name}: {level}")
+        levels[name] = value
+    return levels
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per record, with any ``extra`` fields included."""
+    _RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.datetime.fromtimestamp(record.created, now_tz).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "module": record.module,
+            "line": record.lineno,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        for key, value in vars(record).items():
+            if key not in self._RESERVED and not key.startswith("_"):
+                entry[key] = value
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RotatingLogFileHandler(BaseRotatingHandler):
+    """
+    Log file rotated at local midnight and, if ``max_bytes`` is set, whenever it would grow past ``max_bytes``.
+
+    Rotated files are named ``<file>.<date>`` (then ``<file>.<date>.1``, ``.2``, ... for size rotations on the
+    same day); only the newest ``backup_count`` are kept (0 keeps all).
+    """
+
+    def __init__(self, filename: str, max_bytes: int = 0, backup_count: int = 0, daily: bool = True):
+        super().__init__(filename, "a", encoding="utf-8", delay=True)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.daily = daily
+        # an existing file belongs to the day it was last written, so one left over from an earlier day (e.g.
+        # across a restart) is rotated on the first emit instead of collecting another day's lines
+        since = os.path.getmtime(self.baseFilename) if os.path.exists(self.baseFilename) else None
+        self.period = self.today(since)
+        self.rollover_at = self.next_midnight(since)
+
+    @staticmethod
+    def today(at: float | None = None) -> datetime.date:
+        return datetime.datetime.fromtimestamp(at, now_tz).date() if at is not None \
+            else datetime.datetime.now(now_tz).date()
+
+    def next_midnight(self, at: float | None = None) -> float:
+        tomorrow = self.today(at) + datetime.timedelta(days=1)
+        return datetime.datetime.combine(tomorrow, datetime.time(), now_tz).timestamp()
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if self.daily and record.created >= self.rollover_at:
+            return True
+        if self.max_bytes > 0:
+            if self.stream is None:
+                self.stream = self._open()
+            if self.stream.tell() > 0 and self.stream.tell() + len(self.format(record)) + 1 >= self.max_bytes:
+                return True
+        return False
+
+    def doRollover(self):
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        name = f"{self.baseFilename}.{self.period.isoformat()}"
+        target, i = name, 0
+        while os.path.exists(target):
+            i += 1
+            target = f"{name}.{i}"
+        if os.path.exists(self.baseFilename):
+            self.rotate(self.baseFilename, target)
+        if self.backup_count > 0:
+            self.delete_old()
+        self.period = self.today()
+        self.rollover_at = self.next_midnight()
+
+    def delete_old(self):
+        directory, base = os.path.split(self.baseFilename)
+        backups = [os.path.join(directory, name) for name in os.listdir(directory) if name.startswith(base + ".")]
+        backups.sort(key=os.path.getmtime)
+        for path in backups[:-self.backup_count]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
 class MyLogger:
-    def __init__(self):
+    """
+    Sets up the root logger. The logging call only merges the message and puts the record on a queue; a
+    background listener thread writes it to the console and to ``logs/bot.log`` (and ``logs/bot.jsonl`` if JSON
+    output is on), so logging never blocks the event loop on I/O.
+
+    Settings not given are read from the environment:
+
+    - ``LOG_LEVEL``: root level (default DEBUG)
+    - ``LOG_LEVELS``: per-module levels, e.g. ``discord=INFO,aiohttp=WARNING``
+    - ``LOG_MAX_BYTES``: rotate the log file once it reaches this size (default 10 MB; 0 rotates daily only)
+    - ``LOG_BACKUP_COUNT``: rotated files to keep (default 30)
+    - ``LOG_JSON``: also write JSON lines (1 / true to enable)
+    """
+
+    def __init__(self, level: str | None = None, levels: dict[str, int] | None = None, max_bytes: int | None = None,
+                 backup_count: int | None = None, json_lines: bool | None = None):
         super().__init__()
+        self.level = level or os.getenv("LOG_LEVEL", "DEBUG").upper()
+        self.levels = levels if levels is not None else parse_levels(os.getenv("LOG_LEVELS", ""))
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 ** 2)))
+        self.backup_count = backup_count if backup_count is not None else int(os.getenv("LOG_BACKUP_COUNT", "30"))
+        self.json_lines = json_lines if json_lines is not None \
+            else os.getenv("LOG_JSON", "").lower() in ("1", "true", "yes")
+        self.listener: QueueListener | None = None
+        self.queue_handler: QueueHandler | None = None
         self.c_logger = self.color_logger()
+        atexit.register(self.close)
 
-    @staticmethod
-    def color_logger():
+    def color_logger(self):
         formatter = ColoredFormatter(
             fmt="%(white)s[%(asctime)s] %(log_color)s%(levelname)-10s%(reset)s %(blue)s%(message)s",
             datefmt="%Y-%m-%d %H:%M:%S",
@@ -29,25 +159,47 @@ class MyLogger:
                 "CRITICAL": "red",
             },
         )
-
-        logger = logging.getLogger()
         handler = logging.StreamHandler()
         handler.setFormatter(formatter)
-        logger.addHandler(handler)
-        log_path = os.path.join(base_dir, "logs",
-                                f"logs {datetime.datetime.now(tz=now_tz).strftime('%Y.%m.%d %H.%M.%S')}.log")
-        with open(log_path, "w"):
-            pass
+        handlers: list[logging.Handler] = [handler]
+
+        log_dir = os.path.join(base_dir, "logs")
+        os.makedirs(log_dir, exist_ok=True)
         f_formatter = logging.Formatter(
-            fmt="[%(asctime)s] %(levelname)-10s %(message)s",
+            fmt="[%(asctime)s] %(levelname)-10s %(name)s: %(message)s",
             datefmt="%Y-%m-%d %H:%M:%S")
-        f_handler = logging.FileHandler(log_path, encoding="utf-8")
+        f_handler = RotatingLogFileHandler(os.path.join(log_dir, "bot.log"), self.max_bytes, self.backup_count)
         f_handler.setFormatter(f_formatter)
-        logger.addHandler(f_handler)
-        logger.setLevel(logging.DEBUG)
+        handlers.append(f_handler)
+        if self.json_lines:
+            j_handler = RotatingLogFileHandler(os.path.join(log_dir, "bot.jsonl"), self.max_bytes, self.backup_count)
+            j_handler.setFormatter(JsonLinesFormatter())
+            handlers.append(j_handler)
+
+        logger = logging.getLogger()
+        log_queue = queue.SimpleQueue()
+        # the stock prepare() merges the message on the calling thread, while its arguments still hold their
+        # current values
+        self.queue_handler = QueueHandler(log_queue)
+        logger.addHandler(self.queue_handler)
+        logger.setLevel(self.level)
+        for name, level in self.levels.items():
+            logging.getLogger(name).setLevel(level)
+        self.listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        self.listener.start()
 
         return logger
 
+    def close(self):
+        # blocking: waits for the queue to drain
+        if self.listener is None:
+            return
+        self.c_logger.removeHandler(self.queue_handler)
+        self.listener.stop()
+        for handler in self.listener.handlers:
+            handler.close()
+        self.listener = None
+
     def debug(self, message: str):
         self.c_logger.debug(message)
 
@@ -1,33 +1,85 @@
 # coding=utf-8
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 import os
+import logging
 from dotenv import load_dotenv
 import zoneinfo
 
 import logger
 from roboweb_api import RobowebAPI
+from ws_manager import WebSocketManager
+from scheduler import Scheduler
+from dm_delivery import DMDelivery
+from voice_roster import VoiceRoster
 
 
-# 機器人
-intents = discord.Intents.all()
-bot = commands.Bot(intents=intents, help_command=None)
 # 常用物件、變數
 base_dir = os.path.abspath(os.path.dirname(__file__))
 now_tz = zoneinfo.ZoneInfo("Asia/Taipei")
 default_color = 0x012A5E
 error_color = 0xF1411C
-real_logger = logger.MyLogger()
-# 載入TOKEN
+# 載入TOKEN (也包含 LOG_* 等日誌設定，因此須在建立 logger 之前載入)
 load_dotenv(dotenv_path=os.path.join(base_dir, "TOKEN.env"))
+real_logger = logger.MyLogger()
 DISCORD_TOKEN = str(os.getenv("DISCORD_TOKEN"))
 
 
+class RobomaniaBot(commands.Bot):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # one pooled API client shared by every cog
+        self.rwapi = RobowebAPI(os.getenv("ROBOWEB_API_TOKEN"))
+        # Roboweb websocket streams; cogs register their event handlers on it
+        self.ws_manager = WebSocketManager(os.getenv("WS_URL"), os.getenv("ROBOWEB_API_TOKEN"))
+        for stream in ("member", "meeting"):
+            self.ws_manager.register(stream, "*", self.rwapi.apply_event)
+        # timed jobs (meeting reminders, announcement unpins); cogs register a handler per job kind
+        self.scheduler = Scheduler()
+        # concurrent DM fan-out (e.g. meeting reminders)
+        self.dm_delivery = DMDelivery(self)
+        # who is in which voice channel; kept up to date by the General cog
+        self.voice_roster = VoiceRoster()
+
+    async def start(self, *args, **kwargs):
+        # before connecting, so no event or command handler ever waits on reading the index file
+        await self.rwapi.load_member_index()
+        await super().start(*args, **kwargs)
+
+    async def close(self):
+        await self.scheduler.close()
+        await self.ws_manager.close()
+        await self.rwapi.close()
+        await super().close()
+
+
+# 機器人
+intents = discord.Intents.all()
+bot = RobomaniaBot(intents=intents, help_command=None)
+
+
+# 成員索引：每 30 分鐘增量更新一次，每天完整重建一次 (清除已刪除的成員)
+INDEX_REFRESH_MINUTES = 30
+FULL_INDEX_EVERY = 48
+
+
+@tasks.loop(minutes=INDEX_REFRESH_MINUTES)
+async def refresh_member_index():
+    full = refresh_member_index.current_loop % FULL_INDEX_EVERY == FULL_INDEX_EVERY - 1
+    try:
+        await bot.rwapi.index_members(full=full)
+    except Exception as e:
+        logging.error(f"Failed to refresh member index: {type(e).__name__}: {str(e)}")
+
+
 @bot.event
 async def on_ready():
-    rw_api = RobowebAPI(os.getenv("ROBOWEB_API_TOKEN"))
-    await rw_api.index_members()
-    await rw_api.session.close()
+    # on_ready fires again after every gateway reconnect; the refresh loop, scheduler and websockets only need to be
+    # started once
+    if not refresh_member_index.is_running():
+        refresh_member_index.start()
+    bot.scheduler.start()
+    bot.ws_manager.start()
 
 
 @bot.slash_command(name="ping")
@@ -37,3 +89,4 @@ async def ping(ctx: discord.ApplicationContext):
 
 bot.load_extensions("cogs.general", "cogs.new_verification", "cogs.meeting", "cogs.member", "cogs.announcement")
 bot.run(DISCORD_TOKEN)
+real_logger.close()
@@ -0,0 +1,129 @@
+# coding=utf-8
+import os
+import time
+from collections import Counter, deque
+
+
+class EndpointMetrics:
+    # histogram bucket upper bounds, in seconds
+    BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+    # recent latencies kept for percentile calculation
+    WINDOW_SIZE = 1000
+
+    def __init__(self):
+        self.calls = 0
+        self.status_counts: Counter[str] = Counter()
+        self.bucket_counts = [0] * (len(self.BUCKETS) + 1)
+        self.latency_sum = 0.0
+        self.recent_latencies: deque[float] = deque(maxlen=self.WINDOW_SIZE)
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def record(self, status: int | str, latency: float, bytes_sent: int = 0, bytes_received: int = 0):
+        self.calls += 1
+        self.status_counts[str(status)] += 1
+        self.latency_sum += latency
+        self.recent_latencies.append(latency)
+        for i, bound in enumerate(self.BUCKETS):
+            if latency <= bound:
+                self.bucket_counts[i] += 1
+                break
+        else:
+            self.bucket_counts[-1] += 1
+        self.bytes_sent += bytes_sent
+        self.bytes_received += bytes_received
+
+    def percentile(self, p: float) -> float:
+        if not self.recent_latencies:
+            return 0.0
+        ordered = sorted(self.recent_latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+class APIMetrics:
+    """
+    Per-endpoint call counts, status codes, latency and traffic for RobowebAPI, plus hit ratios of the
+    caches registered with it.
+    """
+
+    def __init__(self, prefix: str = "roboweb_api"):
+        self.prefix = prefix
+        self.started_at = time.time()
+        self.endpoints: dict[str, EndpointMetrics] = {}
+        self.caches: dict[str, object] = {}
+
+    def register_cache(self, name: str, cache):
+        self.caches[name] = cache
+
+    def record(self, endpoint: str, status: int | str, latency: float, bytes_sent: int = 0,
+               bytes_received: int = 0):
+        if endpoint not in self.endpoints:
+            self.endpoints[endpoint] = EndpointMetrics()
+        self.endpoints[endpoint].record(status, latency, bytes_sent, bytes_received)
+
+    def summary(self) -> dict:
+        return {
+            "endpoints": {
+                name: {
+                    "calls": m.calls,
+                    "status_counts": dict(m.status_counts),
+                    "p50": m.percentile(50),
+                    "p95": m.percentile(95),
+                    "p99": m.percentile(99),
+                    "bytes_sent": m.bytes_sent,
+                    "bytes_received": m.bytes_received,
+                }
+                for name, m in self.endpoints.items()
+            },
+            "caches": {name: cache.stats() for name, cache in self.caches.items()},
+        }
+
+    def to_prometheus(self) -> str:
+        p = self.prefix
+        lines = [
+            f"# HELP {p}_requests_total Requests sent to the Roboweb API, by endpoint and status.",
+            f"# TYPE {p}_requests_total counter",
+        ]
+        for name, m in self.endpoints.items():
+            for status, count in sorted(m.status_counts.items()):
+                lines.append(f'{p}_requests_total{{endpoint="{_escape(name)}",status="{status}"}} {count}')
+        lines += [
+            f"# HELP {p}_request_duration_seconds Roboweb API request latency.",
+            f"# TYPE {p}_request_duration_seconds histogram",
+        ]
+        for name, m in self.endpoints.items():
+            label = f'endpoint="{_escape(name)}"'
+            cumulative = 0
+            for bound, count in zip(m.BUCKETS, m.bucket_counts):
+                cumulative += count
+                lines.append(f'{p}_request_duration_seconds_bucket{{{label},le="{bound}"}} {cumulative}')
+            lines.append(f'{p}_request_duration_seconds_bucket{{{label},le="+Inf"}} {m.calls}')
+            lines.append(f"{p}_request_duration_seconds_sum{{{label}}} {m.latency_sum}")
+            lines.append(f"{p}_request_duration_seconds_count{{{label}}} {m.calls}")
+        lines += [
+            f"# HELP {p}_bytes_total Bytes transferred to and from the Roboweb API.",
+            f"# TYPE {p}_bytes_total counter",
+        ]
+        for name, m in self.endpoints.items():
+            lines.append(f'{p}_bytes_total{{endpoint="{_escape(name)}",direction="sent"}} {m.bytes_sent}')
+            lines.append(f'{p}_bytes_total{{endpoint="{_escape(name)}",direction="received"}} {m.bytes_received}')
+        lines += [
+            f"# HELP {p}_cache_lookups_total Cache lookups, by cache and result.",
+            f"# TYPE {p}_cache_lookups_total counter",
+        ]
+        for name, cache in self.caches.items():
+            stats = cache.stats()
+            for result in ("hits", "stale_hits", "misses"):
+                lines.append(f'{p}_cache_lookups_total{{cache="{_escape(name)}",result="{result}"}} {stats[result]}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str):
+        # blocking; written to a temp file first so the textfile collector never reads a partial file
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, path)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
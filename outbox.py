@@ -0,0 +1,76 @@
+# coding=utf-8
+import asyncio
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+
+class Outbox:
+    """
+    Durable, ordered queue of outbound websocket messages, kept in SQLite so that messages sent while a stream is
+    down survive a restart. A message with a ``coalesce_key`` replaces any queued message with the same key on the
+    same stream (e.g. an older roles snapshot).
+    """
+
+    def __init__(self, path: str = "ws_outbox.sqlite3"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS outbox ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "stream TEXT NOT NULL, "
+                "coalesce_key TEXT, "
+                "message TEXT NOT NULL, "
+                "created_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS outbox_stream ON outbox (stream, id)")
+            rows = self._conn.execute("SELECT stream, COUNT(*) FROM outbox GROUP BY stream").fetchall()
+        self.pending: Counter[str] = Counter(dict(rows))
+
+    def _put(self, stream: str, message: str, coalesce_key: str | None) -> int:
+        with self._lock, self._conn:
+            removed = 0
+            if coalesce_key is not None:
+                removed = self._conn.execute(
+                    "DELETE FROM outbox WHERE stream = ? AND coalesce_key = ?", (stream, coalesce_key)
+                ).rowcount
+            self._conn.execute(
+                "INSERT INTO outbox (stream, coalesce_key, message, created_at) VALUES (?, ?, ?, ?)",
+                (stream, coalesce_key, message, time.time()),
+            )
+        return removed
+
+    async def put(self, stream: str, message: str, coalesce_key: str | None = None):
+        # counted before the write, so a flush running meanwhile never sees an empty outbox while a put is in flight
+        self.pending[stream] += 1
+        try:
+            removed = await asyncio.to_thread(self._put, stream, message, coalesce_key)
+        except BaseException:
+            self.pending[stream] -= 1
+            raise
+        self.pending[stream] -= removed
+
+    def _peek(self, stream: str, limit: int) -> list[tuple[int, str]]:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, message FROM outbox WHERE stream = ? ORDER BY id LIMIT ?", (stream, limit)
+            ).fetchall()
+
+    async def peek(self, stream: str, limit: int = 100) -> list[tuple[int, str]]:
+        """The oldest queued messages of ``stream`` as (row id, message) pairs."""
+        return await asyncio.to_thread(self._peek, stream, limit)
+
+    def _remove(self, row_id: int) -> int:
+        with self._lock, self._conn:
+            return self._conn.execute("DELETE FROM outbox WHERE id = ?", (row_id,)).rowcount
+
+    async def remove(self, stream: str, row_id: int):
+        removed = await asyncio.to_thread(self._remove, row_id)
+        self.pending[stream] -= removed
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
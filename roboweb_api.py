@@ -1,64 +1,511 @@
 # coding=utf-8
 import aiohttp
+import asyncio
+import logging
+import os
+import random
+import time
+from email.utils import parsedate_to_datetime
 from os import getenv
-from json import dump, load
+from json import dump, dumps, load, loads
 from dotenv import load_dotenv
 
+from cache import TTLCache
+from metrics import APIMetrics
+
+
+class RobowebAPIError(Exception):
+    """Base class for errors raised by RobowebAPI."""
+    retryable = False
+
+
+class RobowebHTTPError(RobowebAPIError):
+    """The panel answered with an unexpected status code."""
+
+    def __init__(self, action: str, status: int, body: str = ""):
+        super().__init__(f"Failed to {action}: {status} ({body})")
+        self.action = action
+        self.status = status
+        self.body = body
+        self.retryable = status in RobowebAPI.RETRY_STATUSES
+
+
+class RobowebTransportError(RobowebAPIError):
+    """The request did not get a response (connection error or timeout)."""
+    retryable = True
+
+
+class RobowebDecodeError(RobowebAPIError):
+    """The panel answered with the expected status code, but the body isn't valid JSON."""
+
+
+class RobowebUnavailableError(RobowebAPIError):
+    """The circuit breaker is open; the panel is assumed to be down and requests fail fast."""
+
+
+class CircuitBreaker:
+    """
+    Opens after ``failure_threshold`` consecutive failures. While open, requests fail immediately; after
+    ``reset_timeout`` seconds a single probe request is let through, which closes the breaker on success.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if time.monotonic() - self.opened_at >= self.reset_timeout else "open"
+
+    def before_request(self):
+        if self.opened_at is None:
+            return
+        if self.state == "open" or self.probing:
+            raise RobowebUnavailableError("Roboweb API is unavailable (circuit breaker open)")
+        self.probing = True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.probing = False
+        if self.failures >= self.failure_threshold:
+            if self.opened_at is None or self.state == "half-open":
+                logging.warning(f"Roboweb API circuit breaker opened after {self.failures} failures")
+            self.opened_at = time.monotonic()
+
+
+class MemberIndex:
+    """
+    Process-wide in-memory copy of members_index.json, keyed by id, discord_id and real_name.
+
+    The getters never touch the disk; the file is read once at startup (RobowebAPI.load_member_index). Until then
+    they find nothing, and callers fall back to the API.
+    """
+
+    def __init__(self, path: str = "members_index.json"):
+        self.path = path
+        self.loaded = False
+        # conditional / incremental refresh state, persisted alongside the members
+        self.etag: str | None = None
+        self.cursor: str | None = None
+        self.by_id: dict[int, dict] = {}
+        self.by_discord_id: dict[int, dict] = {}
+        self.by_real_name: dict[str, dict] = {}
+
+    def rebuild(self, members: list[dict]):
+        by_id, by_discord_id, by_real_name = {}, {}, {}
+        for member in members:
+            by_id[member["id"]] = member
+            if member.get("discord_id"):
+                by_discord_id[int(member["discord_id"])] = member
+            if member.get("real_name"):
+                by_real_name[member["real_name"]] = member
+        # swap all three maps in one step so readers never see a half-built index
+        self.by_id, self.by_discord_id, self.by_real_name = by_id, by_discord_id, by_real_name
+        self.loaded = True
+
+    def merge(self, members: list[dict]):
+        # only touches the changed members, so an incremental refresh costs O(changes), not O(roster)
+        for member in members:
+            self.upsert(member)
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = load(f)
+        except FileNotFoundError:
+            self.loaded = True
+            return
+        if isinstance(data, list):  # index written before etag / cursor were tracked
+            self.rebuild(data)
+        else:
+            self.etag = data.get("etag")
+            self.cursor = data.get("cursor")
+            self.rebuild(data.get("members", []))
+
+    def save(self):
+        # blocking; run it off the event loop. Written compactly to a temp file, then swapped in atomically.
+        data = {"etag": self.etag, "cursor": self.cursor, "members": list(self.by_id.values())}
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+
+    def upsert(self, member: dict):
+        old = self.by_id.get(member["id"])
+        if old is not None:
+            if old.get("discord_id"):
+                self.by_discord_id.pop(int(old["discord_id"]), None)
+            if old.get("real_name"):
+                self.by_real_name.pop(old["real_name"], None)
+        self.by_id[member["id"]] = member
+        if member.get("discord_id"):
+            self.by_discord_id[int(member["discord_id"])] = member
+        if member.get("real_name"):
+            self.by_real_name[member["real_name"]] = member
+
+    def get(self, pk: int) -> dict | None:
+        return self.by_id.get(pk)
+
+    def get_by_discord_id(self, discord_id: int | str) -> dict | None:
+        return self.by_discord_id.get(int(discord_id))
+
+    def get_by_real_name(self, real_name: str) -> dict | None:
+        return self.by_real_name.get(real_name)
+
 
 class RobowebAPI:
     # BASE_URL = "https://frc7636.dpdns.org/api/"
     load_dotenv("TOKEN.env")
     BASE_URL = getenv("ROBOWEB_API_URL")
+    member_index = MemberIndex()
+
+    # connection pool tuning, shared by every cog through the bot-owned client
+    POOL_LIMIT = 20
+    POOL_LIMIT_PER_HOST = 10
+    KEEPALIVE_TIMEOUT = 60
+    DNS_CACHE_TTL = 300
+    TIMEOUT = aiohttp.ClientTimeout(total=15, connect=5, sock_read=10)
+    # per-endpoint overrides of TIMEOUT, keyed by the action name passed to _request()
+    ENDPOINT_TIMEOUTS = {
+        "index members": aiohttp.ClientTimeout(total=60, connect=5, sock_read=30),
+        "create login code": aiohttp.ClientTimeout(total=10, connect=5),
+    }
+    # only idempotent requests are retried
+    IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS")
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+    MAX_RETRIES = 3
+    RETRY_BASE_DELAY = 0.5
+    RETRY_MAX_DELAY = 10
+    BREAKER_FAILURE_THRESHOLD = 5
+    BREAKER_RESET_TIMEOUT = 30
+    # search_members() results, keyed by the search parameters
+    SEARCH_CACHE_SIZE = 512
+    SEARCH_CACHE_TTL = 600
+    # live member / meeting records; kept fresh by websocket events (see apply_event)
+    RECORD_CACHE_SIZE = 256
+    RECORD_CACHE_TTL = 300
+    # max concurrent live fetches when resolving index misses in bulk
+    BULK_FETCH_CONCURRENCY = 5
 
-    def __init__(self, token: str = getenv("ROBOWEB_API_TOKEN")):
+    def __init__(self, token: str = getenv("ROBOWEB_API_TOKEN"), base_url: str | None = None):
         self.token = token
+        if base_url is not None:  # e.g. a local fake server
+            self.BASE_URL = base_url
         self.headers = {"Authorization": f"Token {self.token}"}
-        self.session = aiohttp.ClientSession(headers=self.headers)
+        self._session: aiohttp.ClientSession | None = None
+        self.search_cache = TTLCache(maxsize=self.SEARCH_CACHE_SIZE, ttl=self.SEARCH_CACHE_TTL)
+        self.member_cache = TTLCache(maxsize=self.RECORD_CACHE_SIZE, ttl=self.RECORD_CACHE_TTL)
+        self.meeting_cache = TTLCache(maxsize=self.RECORD_CACHE_SIZE, ttl=self.RECORD_CACHE_TTL)
+        self._inflight: dict[tuple, asyncio.Task] = {}
+        self.breaker = CircuitBreaker(self.BREAKER_FAILURE_THRESHOLD, self.BREAKER_RESET_TIMEOUT)
+        self.metrics = APIMetrics()
+        self.metrics.register_cache("search_members", self.search_cache)
+        self.metrics.register_cache("member_info", self.member_cache)
+        self.metrics.register_cache("meeting_info", self.meeting_cache)
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        # created lazily so that the session is bound to the bot's running event loop
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.POOL_LIMIT,
+                limit_per_host=self.POOL_LIMIT_PER_HOST,
+                keepalive_timeout=self.KEEPALIVE_TIMEOUT,
+                ttl_dns_cache=self.DNS_CACHE_TTL,
+                use_dns_cache=True,
+            )
+            self._session = aiohttp.ClientSession(headers=self.headers, connector=connector, timeout=self.TIMEOUT)
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    @staticmethod
+    def _parse_retry_after(value: str | None) -> float | None:
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    def _retry_delay(self, attempt: int, retry_after: float | None) -> float:
+        # "full jitter" exponential backoff, but never sooner than the server asked for
+        delay = random.uniform(0, min(self.RETRY_MAX_DELAY, self.RETRY_BASE_DELAY * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.RETRY_MAX_DELAY * 3))
+        return delay
+
+    async def _request(self, method: str, url: str, action: str, expected: tuple[int, ...] = (200,),
+                       **kwargs) -> tuple[int, dict, object]:
+        """
+        Send a request through the circuit breaker, retrying idempotent methods on transport errors and
+        retryable status codes.
+        :param action: Names the endpoint for timeouts and error messages, e.g. "fetch meeting info".
+        :return: (status, response headers, decoded JSON body or None for 204 / 304)
+        """
+        retries = self.MAX_RETRIES if method in self.IDEMPOTENT_METHODS else 0
+        timeout = self.ENDPOINT_TIMEOUTS.get(action, self.TIMEOUT)
+        if "json" in kwargs:
+            # serialized here so the request size can be recorded
+            kwargs["data"] = dumps(kwargs.pop("json")).encode("utf-8")
+            kwargs["headers"] = {**kwargs.get("headers", {}), "Content-Type": "application/json"}
+        bytes_sent = len(kwargs.get("data") or b"")
+        attempt = 0
+        while True:
+            try:
+                self.breaker.before_request()
+            except RobowebUnavailableError:
+                self.metrics.record(action, "circuit_open", 0)
+                raise
+            retry_after = None
+            started = time.perf_counter()
+            try:
+                async with self.session.request(method, url, timeout=timeout, **kwargs) as response:
+                    body = await response.read()
+                    self.metrics.record(action, response.status, time.perf_counter() - started, bytes_sent, len(body))
+                    if response.status in expected:
+                        try:
+                            data = loads(body) if body and response.status not in (204, 304) else None
+                        except ValueError as e:
+                            raise RobowebDecodeError(f"Failed to {action}: invalid JSON in response "
+                                                     f"({type(e).__name__}: {str(e)})") from e
+                        self.breaker.record_success()
+                        return response.status, response.headers, data
+                    error = RobowebHTTPError(action, response.status, body.decode("utf-8", "replace"))
+                    retry_after = self._parse_retry_after(response.headers.get("Retry-After"))
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                self.metrics.record(action, "error", time.perf_counter() - started, bytes_sent)
+                error = RobowebTransportError(f"Failed to {action}: {type(e).__name__}: {str(e)}")
+                error.__cause__ = e
+            except RobowebDecodeError:
+                # the panel answered, but with something broken (e.g. an HTML error page with status 200)
+                self.breaker.record_failure()
+                raise
+            except asyncio.CancelledError:
+                # the caller gave up, which says nothing about the panel; just free the probe slot
+                self.breaker.probing = False
+                raise
+            # 4xx responses mean the panel is up, so they don't count towards opening the breaker
+            if isinstance(error, RobowebHTTPError) and error.status < 500 and error.status != 429:
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+            if attempt >= retries or not error.retryable:
+                raise error
+            delay = self._retry_delay(attempt, retry_after)
+            attempt += 1
+            logging.warning(f"{error} Retrying in {delay:.1f} seconds ({attempt}/{retries})...")
+            await asyncio.sleep(delay)
 
-    async def search_members(self, **kwargs) -> list:
+    async def _get(self, url: str, action: str, params: dict | None = None):
+        """
+        GET ``url`` and return the decoded JSON. Concurrent calls with the same URL and parameters share a
+        single in-flight request.
+        :param action: Used in the error message, e.g. "fetch meeting info".
+        """
+        key = (url, tuple(sorted((k, str(v)) for k, v in (params or {}).items())))
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._do_get(url, action, params))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # shielded so that one cancelled caller doesn't cancel the request for everyone else
+        return await asyncio.shield(task)
+
+    async def _do_get(self, url: str, action: str, params: dict | None = None):
+        _, _, data = await self._request("GET", url, action, params=params)
+        if self._is_page(data):
+            # paginated listing: collect every page so that callers of the list methods never see a truncated result
+            rows = list(data["results"])
+            async for row in self._paginate(data["next"], action):
+                rows.append(row)
+            return rows
+        return data
+
+    @staticmethod
+    def _is_page(data) -> bool:
+        return isinstance(data, dict) and "results" in data and "next" in data
+
+    async def _paginate(self, url: str | None, action: str, params: dict | None = None):
+        """
+        Yield rows from a listing endpoint one page at a time. Handles both plain JSON arrays and paginated
+        responses ({"results": [...], "next": <url>}); "next" URLs already carry the query parameters.
+        """
+        while url:
+            _, _, data = await self._request("GET", url, action, params=params)
+            if not self._is_page(data):
+                for row in data:
+                    yield row
+                return
+            for row in data["results"]:
+                yield row
+            url, params = data["next"], None
+
+    def iter_members(self, **kwargs):
+        """
+        Async iterator over members matching the given search parameters (see search_members), page by page.
+        """
+        params = {k: v for k, v in kwargs.items() if v is not None}
+        return self._paginate(f"{self.BASE_URL}members/", "search members", params)
+
+    def iter_bad_guys(self):
+        return self._paginate(f"{self.BASE_URL}members/bad_guys/", "fetch bad guys")
+
+    def iter_upcoming_meetings(self):
+        return self._paginate(f"{self.BASE_URL}meetings/upcoming/", "fetch upcoming meetings")
+
+    def iter_absent_requests(self, meeting_id: int):
+        return self._paginate(f"{self.BASE_URL}absent_requests/", "fetch absent requests", {"meeting__id": meeting_id})
+
+    @staticmethod
+    def _search_key(params: dict) -> tuple:
+        # discord_id is passed as both int and str by callers, so normalize every value to str
+        return tuple(sorted((k, str(v)) for k, v in params.items()))
+
+    async def search_members(self, cached: bool = False, stale_ok: bool = False, **kwargs) -> list:
         """
         Search members with given parameters.
+        :param cached: Allow a result cached for up to SEARCH_CACHE_TTL seconds (for hot paths such as voice state
+        updates). Registration checks should leave this off, so that newly registered members are found at once.
+        :param stale_ok: With ``cached``, return an expired cached result immediately and refresh it in the
+        background.
         :param kwargs: Supports "discord_id", "real_name", "email_address", "gen", and "warning_points".
         :return:
         """
-        url = f"{self.BASE_URL}members/"
         params = {k: v for k, v in kwargs.items() if v is not None}
-        async with self.session.get(url, params=params) as response:
-            print(response.url)
-            if response.status != 200:
-                raise Exception(f"Failed to search members: {response.status} ({await response.text()})")
-            return await response.json()
+        key = self._search_key(params)
+        if not cached:
+            result = await self._search_members(params)
+            if result:
+                self.search_cache.set(key, result)
+            return result
+        result = await self.search_cache.get_or_fetch(
+            key, lambda: self._search_members(params), stale_while_revalidate=stale_ok
+        )
+        if not result:
+            # "not registered (yet)" isn't cached, so members show up as soon as they register
+            self.search_cache.invalidate(key)
+        return result
 
-    async def index_members(self):
+    async def _search_members(self, params: dict) -> list:
         url = f"{self.BASE_URL}members/"
-        members = []
-        async with self.session.get(url) as response:
-            if response.status != 200:
-                raise Exception(f"Failed to index members: {response.status} ({await response.text()})")
-            members = await response.json()
-        with open("members_index.json", "w", encoding="utf-8") as f:
-            dump(members, f, ensure_ascii=False, indent=4)
-        return members
+        return await self._get(url, "search members", params)
+
+    async def load_member_index(self):
+        """Read members_index.json into the member index, off the event loop."""
+        if not self.member_index.loaded:
+            await asyncio.to_thread(self.member_index.load)
+
+    async def index_members(self, full: bool = False) -> list[dict]:
+        """
+        Refresh the member index. Unless ``full`` is set, the request is conditional (If-None-Match) and
+        incremental (updated_after), so only changed members are downloaded and merged into the index.
+        """
+        url = f"{self.BASE_URL}members/"
+        index = self.member_index
+        await self.load_member_index()
+        headers, params = {}, {}
+        incremental = not full and len(index.by_id) > 0
+        if incremental:
+            if index.etag:
+                headers["If-None-Match"] = index.etag
+            if index.cursor:
+                params["updated_after"] = index.cursor
+        status, response_headers, members = await self._request(
+            "GET", url, "index members", expected=(200, 304), headers=headers, params=params
+        )
+        if status == 304:
+            return list(index.by_id.values())
+        etag = response_headers.get("ETag")
+        if self._is_page(members):
+            next_url, members = members["next"], list(members["results"])
+            async for member in self._paginate(next_url, "index members"):
+                members.append(member)
+        if incremental and index.cursor:
+            if not members:
+                # nothing changed since the cursor; only rewrite the file if the ETag needs saving
+                if etag != index.etag:
+                    index.etag = etag
+                    await asyncio.to_thread(index.save)
+                return list(index.by_id.values())
+            index.merge(members)
+        else:
+            index.rebuild(members)
+        index.etag = etag
+        updated_at = [member["updated_at"] for member in members if member.get("updated_at")]
+        if updated_at:
+            index.cursor = max(updated_at + ([index.cursor] if index.cursor else []))
+        await asyncio.to_thread(index.save)
+        return list(index.by_id.values())
 
     async def get_member_info(self, pk: int, from_index: bool = False) -> dict:
         if from_index:
-            with open("members_index.json", "r", encoding="utf-8") as f:
-                members = load(f)
-            for member in members:
-                if member["id"] == pk:
-                    return member
+            member = self.member_index.get(pk)
+            if member is not None:
+                return member
+        return await self.member_cache.get_or_fetch(pk, lambda: self._fetch_member_info(pk))
+
+    async def _fetch_member_info(self, pk: int) -> dict:
         url = f"{self.BASE_URL}members/{pk}/"
-        async with self.session.get(url) as response:
-            if response.status != 200:
-                raise Exception(f"Failed to fetch member info: {response.status} ({await response.text()})")
-            return await response.json()
+        member = await self._get(url, "fetch member info")
+        self.member_index.upsert(member)
+        return member
+
+    async def get_members_bulk(self, pks) -> dict[int, dict]:
+        """
+        Resolve several members at once. Answered from the member index in one pass; misses are fetched
+        concurrently (at most BULK_FETCH_CONCURRENCY at a time).
+        :return: A dict of pk -> member. Members that could not be fetched are left out.
+        """
+        members, misses = {}, []
+        for pk in dict.fromkeys(pks):
+            member = self.member_index.get(pk)
+            if member is not None:
+                members[pk] = member
+            elif pk is not None:
+                misses.append(pk)
+        if misses:
+            semaphore = asyncio.Semaphore(self.BULK_FETCH_CONCURRENCY)
+
+            async def fetch(pk):
+                async with semaphore:
+                    return await self.get_member_info(pk)
+
+            results = await asyncio.gather(*(fetch(pk) for pk in misses), return_exceptions=True)
+            for pk, result in zip(misses, results):
+                if isinstance(result, Exception):
+                    logging.warning(f"Failed to resolve member #{pk}: {type(result).__name__}: {str(result)}")
+                else:
+                    members[pk] = result
+        return members
+
+    async def resolve_discord_ids(self, pks) -> dict[int, int]:
+        """
+        :return: A dict of pk -> Discord ID for the given member pks.
+        """
+        members = await self.get_members_bulk(pks)
+        return {pk: int(member["discord_id"]) for pk, member in members.items() if member.get("discord_id")}
 
     async def get_bad_guys(self) -> list:
         url = f"{self.BASE_URL}members/bad_guys/"
-        async with self.session.get(url) as response:
-            if response.status != 200:
-                raise Exception(f"Failed to fetch bad guys: {response.status} ({await response.text()})")
-            return await response.json()
+        return await self._get(url, "fetch bad guys")
 
     async def create_member(self, discord_id: int, real_name: str, gen: int, email_address: str = None,
                             avatar_url: str = None) -> dict:
@@ -70,31 +517,26 @@ class RobowebAPI:
             "email_address": email_address,
             "avatar": avatar_url,
         }
-        async with self.session.post(url, json=payload) as response:
-            if response.status != 201:
-                raise Exception(f"Failed to create member: {response.status} ({await response.text()})")
-            return await response.json()
+        _, _, member = await self._request("POST", url, "create member", expected=(201,), json=payload)
+        # a cached empty search for this Discord ID is no longer valid
+        self.search_cache.invalidate(self._search_key({"discord_id": discord_id}))
+        self.member_index.upsert(member)
+        return member
 
     async def get_meeting_info(self, meeting_id: int) -> dict:
+        return await self.meeting_cache.get_or_fetch(meeting_id, lambda: self._fetch_meeting_info(meeting_id))
+
+    async def _fetch_meeting_info(self, meeting_id: int) -> dict:
         url = f"{self.BASE_URL}meetings/{meeting_id}/"
-        async with self.session.get(url) as response:
-            if response.status != 200:
-                raise Exception(f"Failed to fetch meeting info: {response.status} ({await response.text()})")
-            return await response.json()
+        return await self._get(url, "fetch meeting info")
 
     async def get_upcoming_meetings(self) -> list[dict]:
         url = f"{self.BASE_URL}meetings/upcoming/"
-        async with self.session.get(url) as response:
-            if response.status != 200:
-                raise Exception(f"Failed to fetch upcoming meetings: {response.status} ({await response.text()})")
-            return await response.json()
+        return await self._get(url, "fetch upcoming meetings")
 
     async def get_absent_requests(self, meeting_id: int) -> list:
-        url = f"{self.BASE_URL}absent_requests/?meeting__id={meeting_id}"
-        async with self.session.get(url) as response:
-            if response.status != 200:
-                raise Exception(f"Failed to fetch absent requests: {response.status} ({await response.text()})")
-            return await response.json()
+        url = f"{self.BASE_URL}absent_requests/"
+        return await self._get(url, "fetch absent requests", {"meeting__id": meeting_id})
 
     async def create_absent_request(self, meeting_id: int, member_id: int, reason: str):
         url = f"{self.BASE_URL}absent_requests/"
@@ -103,27 +545,46 @@ class RobowebAPI:
             "member": member_id,
             "reason": reason,
         }
-        async with self.session.post(url, json=payload) as response:
-            if response.status != 201:
-                raise Exception(f"Failed to create absent request: {response.status} ({await response.text()})")
-            return await response.json()
+        _, _, data = await self._request("POST", url, "create absent request", expected=(201,), json=payload)
+        return data
 
     async def get_pinned_announcements(self) -> list:
         url = f"{self.BASE_URL}announcements/pinned/"
-        async with self.session.get(url) as response:
-            if response.status != 200:
-                raise Exception(f"Failed to fetch pinned announcements: {response.status} ({await response.text()})")
-            return await response.json()
+        return await self._get(url, "fetch pinned announcements")
 
     async def create_login_code(self, member_id: int) -> dict:
         url = f"{self.BASE_URL}login_codes/"
         payload = {
             "member": str(member_id),
         }
-        async with self.session.post(url, json=payload) as response:
-            if response.status != 201:
-                raise Exception(f"Failed to create login code: {response.status} ({await response.text()})")
-            return await response.json()
+        _, _, data = await self._request("POST", url, "create login code", expected=(201,), json=payload)
+        return data
+
+    def _cached_member_records(self, pk: int) -> list[dict]:
+        # the index and the caches may hold the same dict object, so de-duplicate by identity
+        records = {}
+        for record in (self.member_index.by_id.get(pk), self.member_cache.peek(pk)):
+            if record is not None:
+                records[id(record)] = record
+        for _, result in self.search_cache.items():
+            for record in result:
+                if record.get("id") == pk:
+                    records[id(record)] = record
+        return list(records.values())
+
+    def apply_event(self, event):
+        """
+        Apply a websocket event (ws_events.Event) from Roboweb to the local member / meeting caches.
+        """
+        if event.type == "member.add_warning_points":
+            warning_detail = event.payload
+            for record in self._cached_member_records(warning_detail.member):
+                if "warning_points" in record:
+                    record["warning_points"] += warning_detail.points
+        elif event.type in ("meeting.create", "meeting.edit"):
+            self.meeting_cache.set(event.payload.id, event.payload.raw)
+        elif event.type == "meeting.delete":
+            self.meeting_cache.invalidate(event.payload.id)
 
 
 if __name__ == "__main__":
@@ -137,7 +598,7 @@ if __name__ == "__main__":
         load_dotenv("TOKEN.env")
         api = RobowebAPI(getenv("ROBOWEB_API_TOKEN"))
         pprint(await api.create_login_code(1))
-        await api.session.close()
+        await api.close()
 
 
     asyncio.run(main())
@@ -0,0 +1,234 @@
+# coding=utf-8
+import asyncio
+import datetime
+import heapq
+import inspect
+import itertools
+import logging
+import time
+from dataclasses import dataclass, field
+from json import dumps, loads
+from typing import Any, Awaitable, Callable
+
+from job_store import JobStore
+
+Handler = Callable[[Any], Awaitable[None] | None]
+
+
+@dataclass(slots=True)
+class Job:
+    key: str
+    kind: str
+    # absolute deadline, as a UTC timestamp
+    deadline: float
+    payload: Any = field(repr=False)
+    seq: int = 0
+
+    @property
+    def when(self) -> datetime.datetime:
+        return datetime.datetime.fromtimestamp(self.deadline, datetime.timezone.utc)
+
+
+class Scheduler:
+    """
+    Runs jobs at absolute times using a single timer.
+
+    Jobs are kept in a min-heap of deadlines, so scheduling costs O(log n) and the timer only wakes up when the
+    earliest job is due (or the earliest deadline changes). Each job has a key; scheduling a job with an existing
+    key replaces it, and cancel() removes it. When a job is due, the handler registered for its kind is called
+    with the job's payload.
+
+    Jobs are persisted in a JobStore and restored by start(). A job whose deadline passed while the bot was down
+    is run late, unless it is later than the catch-up limit registered for its kind, in which case it is marked
+    as missed.
+    """
+    # longest single sleep; the event loop's timer is monotonic, so re-check the wall clock now and then in case
+    # it was adjusted while we were waiting for a job days ahead
+    MAX_SLEEP = 3600
+    # how long finished jobs are kept in the store
+    RETENTION = 7 * 86400
+
+    def __init__(self, path: str = "scheduler.sqlite3"):
+        # (deadline, seq, key); entries of cancelled / replaced jobs are left in place and skipped when popped
+        self._heap: list[tuple[float, int, str]] = []
+        self.jobs: dict[str, Job] = {}
+        self.handlers: dict[str, Handler] = {}
+        # kind -> function that turns a stored (JSON) payload back into what the handler expects
+        self.decoders: dict[str, Callable[[Any], Any]] = {}
+        # kind -> max seconds a job may run late after a restart; None means always run it
+        self.catch_up: dict[str, float | None] = {}
+        self.store = JobStore(path)
+        self._restore_task: asyncio.Task | None = None
+        # set once persisted jobs have been restored, so reconciling with the API can start from them
+        self.restored = asyncio.Event()
+        self._seq = itertools.count()
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self._running: set[asyncio.Task] = set()
+
+    def register(self, kind: str, handler: Handler, decode: Callable[[Any], Any] | None = None,
+                 catch_up: float | None = None):
+        """
+        Call ``handler(payload)`` when a job of ``kind`` is due.
+        :param decode: Rebuilds the payload of a restored job from its JSON form (the payload's ``raw`` dict if it
+        has one, otherwise the payload itself).
+        :param catch_up: Jobs missed by more than this many seconds while the bot was down are skipped.
+        """
+        self.handlers[kind] = handler
+        if decode is not None:
+            self.decoders[kind] = decode
+        self.catch_up[kind] = catch_up
+
+    def unregister(self, owner: object):
+        """Remove every handler that is a bound method of ``owner`` (e.g. a cog being unloaded)."""
+        self.handlers = {kind: h for kind, h in self.handlers.items() if getattr(h, "__self__", None) is not owner}
+
+    def schedule(self, key: str, when: datetime.datetime, kind: str, payload: Any = None) -> Job:
+        """
+        Run the ``kind`` handler with ``payload`` at ``when`` (an aware datetime), replacing any job with the same
+        key. Jobs whose time has already passed run as soon as possible.
+        """
+        job = self._push(key, kind, when.timestamp(), payload)
+        self.store.save(key, kind, job.deadline, dumps(getattr(payload, "raw", payload)))
+        return job
+
+    def _push(self, key: str, kind: str, deadline: float, payload: Any) -> Job:
+        job = Job(key=key, kind=kind, deadline=deadline, payload=payload, seq=next(self._seq))
+        self.jobs[key] = job
+        heapq.heappush(self._heap, (job.deadline, job.seq, key))
+        if self._heap[0][1] == job.seq:
+            # the earliest deadline changed
+            self._wake()
+        return job
+
+    def cancel(self, key: str) -> bool:
+        job = self.jobs.pop(key, None)
+        if job is None:
+            return False
+        self.store.set_status(key, "cancelled")
+        self._compact()
+        return True
+
+    def cancel_where(self, predicate: Callable[[Job], bool]) -> int:
+        keys = [key for key, job in self.jobs.items() if predicate(job)]
+        for key in keys:
+            del self.jobs[key]
+        if keys:
+            self.store.set_status(keys, "cancelled")
+        self._compact()
+        return len(keys)
+
+    def get(self, key: str) -> Job | None:
+        return self.jobs.get(key)
+
+    def _is_live(self, entry: tuple[float, int, str]) -> bool:
+        job = self.jobs.get(entry[2])
+        return job is not None and job.seq == entry[1]
+
+    def _compact(self):
+        # drop stale entries once they make up most of the heap, so it can't grow without bound
+        if len(self._heap) > 2 * len(self.jobs) + 16:
+            self._heap = [entry for entry in self._heap if self._is_live(entry)]
+            heapq.heapify(self._heap)
+
+    def _wake(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def start(self):
+        """Restore persisted jobs (once) and start the timer. Safe to call again."""
+        if self._restore_task is None:
+            self._restore_task = asyncio.create_task(self.restore(), name="scheduler-restore")
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run(), name="scheduler")
+
+    async def restore(self):
+        try:
+            rows = await self.store.load_active(self.RETENTION)
+        except Exception as e:
+            logging.error(f"Failed to restore scheduled jobs: {type(e).__name__}: {str(e)}")
+            self.restored.set()
+            return
+        now = time.time()
+        restored, missed = 0, []
+        for key, kind, deadline, payload in rows:
+            if key in self.jobs:
+                # already (re)scheduled since startup; that version is newer
+                continue
+            late = now - deadline
+            limit = self.catch_up.get(kind)
+            if late > 0 and limit is not None and late > limit:
+                logging.warning(f"Scheduled job {key} ({kind}) was missed by {late:.0f} seconds; skipped")
+                missed.append(key)
+                continue
+            if late > 0:
+                logging.info(f"Scheduled job {key} ({kind}) was missed by {late:.0f} seconds; running it now")
+            payload = loads(payload)
+            if kind in self.decoders:
+                try:
+                    payload = self.decoders[kind](payload)
+                except Exception as e:
+                    logging.error(f"Failed to restore scheduled job {key}: {type(e).__name__}: {str(e)}")
+                    missed.append(key)
+                    continue
+            self._push(key, kind, deadline, payload)
+            restored += 1
+        if missed:
+            self.store.set_status(missed, "missed")
+        logging.info(f"Restored {restored} scheduled job(s), {len(missed)} missed")
+        self.restored.set()
+
+    async def close(self):
+        if self._restore_task is not None:
+            self._restore_task.cancel()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        # jobs cut off here stay "running" in the store and are run again after the restart
+        for task in list(self._running):
+            task.cancel()
+        await asyncio.to_thread(self.store.close)
+
+    async def _run(self):
+        while True:
+            while self._heap and not self._is_live(self._heap[0]):
+                heapq.heappop(self._heap)
+            timeout = None
+            if self._heap:
+                timeout = self._heap[0][0] - time.time()
+                if timeout <= 0:
+                    deadline, seq, key = heapq.heappop(self._heap)
+                    self._fire(self.jobs.pop(key))
+                    continue
+                timeout = min(timeout, self.MAX_SLEEP)
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def _fire(self, job: Job):
+        handler = self.handlers.get(job.kind)
+        if handler is None:
+            logging.warning(f"No handler registered for scheduled job {job.key} ({job.kind}); dropped")
+            return
+        logging.debug(f"Running scheduled job {job.key} ({job.kind}), due {job.when.isoformat()}")
+        self.store.set_status(job.key, "running")
+        task = asyncio.create_task(self._call(handler, job), name=f"job-{job.key}")
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _call(self, handler: Handler, job: Job):
+        try:
+            result = handler(job.payload)
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            logging.exception(f"Scheduled job {job.key} ({job.kind}) failed: {type(e).__name__}: {str(e)}")
+            status = "failed"
+        else:
+            status = "done"
+        # the handler may have scheduled a new job under the same key
+        if job.key not in self.jobs:
+            self.store.set_status(job.key, status)
@@ -0,0 +1,33 @@
+# coding=utf-8
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class SerialExecutor:
+    """
+    One background thread that runs submitted calls in the order they were submitted, e.g. SQLite reads and writes
+    that must not block the event loop or overtake each other. Failures are logged, since most callers don't wait
+    for the result.
+    """
+
+    def __init__(self, name: str, description: str):
+        """
+        :param name: Thread name prefix, e.g. "job-store".
+        :param description: Used in the failure log message, e.g. "Job store".
+        """
+        self.description = description
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=name)
+
+    def submit(self, fn, *args) -> Future:
+        future = self._executor.submit(fn, *args)
+        future.add_done_callback(self._log_failure)
+        return future
+
+    def _log_failure(self, future: Future):
+        if not future.cancelled() and future.exception() is not None:
+            e = future.exception()
+            logging.error(f"{self.description} write failed: {type(e).__name__}: {str(e)}")
+
+    def shutdown(self):
+        # blocking: waits for everything submitted so far
+        self._executor.shutdown(wait=True)
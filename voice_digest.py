@@ -0,0 +1,80 @@
+# coding=utf-8
+import asyncio
+import logging
+import time
+
+import discord
+
+
+class VoiceDigest:
+    """
+    Posts voice join / leave notices in a channel's chat, coalescing bursts.
+
+    The first notice in a quiet channel is posted right away. Notices arriving within ``WINDOW`` seconds of the
+    last post are collected and added to the channel's rolling message with a single edit. A new rolling message
+    is started after ``ROLLING_SECONDS``, or when the next lines won't fit in one message.
+    """
+    WINDOW = 5
+    ROLLING_SECONDS = 300
+    MAX_LENGTH = 2000
+    DELETE_AFTER = 43200
+
+    def __init__(self):
+        self.pending: dict[int, list[str]] = {}
+        self.channels: dict[int, discord.abc.Messageable] = {}
+        self.tasks: dict[int, asyncio.Task] = {}
+        # channel ID -> (rolling message, its lines, when it was posted (monotonic))
+        self.rolling: dict[int, tuple[discord.Message, list[str], float]] = {}
+        self.last_post: dict[int, float] = {}
+
+    def add(self, channel: discord.abc.Messageable, line: str):
+        self.pending.setdefault(channel.id, []).append(line)
+        self.channels[channel.id] = channel
+        task = self.tasks.get(channel.id)
+        if task is None or task.done():
+            delay = self.last_post.get(channel.id, float("-inf")) + self.WINDOW - time.monotonic()
+            self.tasks[channel.id] = asyncio.create_task(self._run(channel.id, delay))
+
+    async def _run(self, channel_id: int, delay: float):
+        while True:
+            if delay > 0:
+                await asyncio.sleep(delay)
+            lines = self.pending.pop(channel_id, None)
+            if not lines:
+                return
+            self.last_post[channel_id] = time.monotonic()
+            try:
+                await self._post(channel_id, lines)
+            except Exception as e:
+                logging.error(f"Failed to post voice notices in {channel_id}: {type(e).__name__}: {str(e)}")
+            delay = self.WINDOW
+
+    async def _post(self, channel_id: int, lines: list[str]):
+        rolling = self.rolling.get(channel_id)
+        if rolling is not None:
+            message, old_lines, posted_at = rolling
+            new_lines = old_lines + lines
+            if (time.monotonic() - posted_at < self.ROLLING_SECONDS
+                    and len("\n".join(new_lines)) <= self.MAX_LENGTH):
+                try:
+                    await message.edit(content="\n".join(new_lines))
+                    self.rolling[channel_id] = (message, new_lines, posted_at)
+                    return
+                except discord.NotFound:
+                    # deleted in the meantime; start a new one
+                    pass
+        chunk: list[str] = []
+        for line in lines:
+            if chunk and len("\n".join(chunk + [line])) > self.MAX_LENGTH:
+                await self._send(channel_id, chunk)
+                chunk = []
+            chunk.append(line)
+        await self._send(channel_id, chunk)
+
+    async def _send(self, channel_id: int, lines: list[str]):
+        message = await self.channels[channel_id].send("\n".join(lines), delete_after=self.DELETE_AFTER)
+        self.rolling[channel_id] = (message, lines, time.monotonic())
+
+    def close(self):
+        for task in self.tasks.values():
+            task.cancel()
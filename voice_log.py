@@ -0,0 +1,79 @@
+# coding=utf-8
+import datetime
+import logging
+import os
+import queue
+import time
+from logging.handlers import MemoryHandler, QueueHandler, QueueListener
+from typing import Literal
+
+import discord
+
+from logger import RotatingLogFileHandler, now_tz
+
+
+class _BatchingListener(QueueListener):
+    """QueueListener that also flushes its handlers whenever the queue has been idle for ``flush_interval``."""
+
+    def __init__(self, q: queue.SimpleQueue, *handlers: logging.Handler, flush_interval: float):
+        super().__init__(q, *handlers, respect_handler_level=True)
+        self.flush_interval = flush_interval
+
+    def dequeue(self, block: bool):
+        while True:
+            try:
+                return self.queue.get(block, timeout=self.flush_interval if block else None)
+            except queue.Empty:
+                if not block:
+                    raise
+                for handler in self.handlers:
+                    handler.flush()
+
+
+class VoiceActivityLog:
+    """
+    Voice channel join / leave log.
+
+    record() only puts the record on a queue; a background thread writes them in batches (every ``batch_size``
+    records, or after ``flush_interval`` seconds without new ones) to ``VC.log``, which is rotated at midnight
+    Asia/Taipei time, like the main log. Each line carries the action, user ID, channel ID and a monotonic timestamp.
+    """
+    FORMAT = "[%(asctime)s] %(action)-5s user=%(user_id)s channel=%(channel_id)s mono=%(monotonic).3f %(message)s"
+
+    def __init__(self, directory: str, backup_count: int = 90, batch_size: int = 50, flush_interval: float = 5):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, "VC.log")
+        self.logger = logging.getLogger("VC")
+        self.logger.setLevel(logging.INFO)
+        # keep voice activity out of the main log
+        self.logger.propagate = False
+        file_handler = RotatingLogFileHandler(self.path, backup_count=backup_count)
+        if time.time() >= file_handler.rollover_at:
+            # left over from an earlier day; archive it under its own date now rather than at the first voice event
+            file_handler.doRollover()
+        formatter = logging.Formatter(fmt=self.FORMAT, datefmt="%Y-%m-%d %H:%M:%S")
+        # timestamps in the same time zone as the daily files
+        formatter.converter = lambda ts: datetime.datetime.fromtimestamp(ts, now_tz).timetuple()
+        file_handler.setFormatter(formatter)
+        self.file_handler = file_handler
+        self.buffer = MemoryHandler(batch_size, flushLevel=logging.CRITICAL, target=file_handler,
+                                    flushOnClose=True)
+        self.queue = queue.SimpleQueue()
+        self.queue_handler = QueueHandler(self.queue)
+        self.logger.addHandler(self.queue_handler)
+        self.listener = _BatchingListener(self.queue, self.buffer, flush_interval=flush_interval)
+        self.listener.start()
+
+    def record(self, action: Literal["join", "leave"], user: discord.User | discord.Member,
+               channel: discord.abc.GuildChannel):
+        self.logger.info(
+            f"{user.name} {'加入' if action == 'join' else '離開'}了 {channel.name}",
+            extra={"action": action, "user_id": user.id, "channel_id": channel.id, "monotonic": time.monotonic()},
+        )
+
+    def close(self):
+        # blocking: waits for the queue to drain
+        self.logger.removeHandler(self.queue_handler)
+        self.listener.stop()
+        self.buffer.close()
+        self.file_handler.close()
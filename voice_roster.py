@@ -0,0 +1,76 @@
+# coding=utf-8
+import time
+
+
+class VoiceRoster:
+    """
+    Who is in which voice channel and since when, kept up to date from voice state events, so that "who is in
+    channel X" is a dict lookup instead of a scan over the guild's voice states.
+
+    Recent leaves are remembered for ``LEFT_RETENTION`` seconds, so attendance checks can also count members who
+    were in the channel earlier but have since left.
+    """
+    LEFT_RETENTION = 6 * 3600
+
+    def __init__(self):
+        # channel ID -> {user ID: joined at}
+        self.channels: dict[int, dict[int, float]] = {}
+        # user ID -> channel ID
+        self.member_channel: dict[int, int] = {}
+        # channel ID -> {user ID: left at}
+        self.left: dict[int, dict[int, float]] = {}
+
+    def join(self, user_id: int, channel_id: int, at: float | None = None):
+        at = time.time() if at is None else at
+        if user_id in self.member_channel:
+            self.leave(user_id, at)
+        self.channels.setdefault(channel_id, {})[user_id] = at
+        self.member_channel[user_id] = channel_id
+
+    def leave(self, user_id: int, at: float | None = None):
+        channel_id = self.member_channel.pop(user_id, None)
+        if channel_id is None:
+            return
+        at = time.time() if at is None else at
+        members = self.channels.get(channel_id, {})
+        members.pop(user_id, None)
+        if not members:
+            self.channels.pop(channel_id, None)
+        left = self.left.setdefault(channel_id, {})
+        left[user_id] = at
+        if len(left) > 64:
+            self._prune(channel_id, at)
+
+    def _prune(self, channel_id: int, now: float):
+        left = self.left.get(channel_id, {})
+        for user_id in [user_id for user_id, left_at in left.items() if now - left_at > self.LEFT_RETENTION]:
+            del left[user_id]
+
+    def rebuild(self, current: dict[int, int], at: float | None = None):
+        """
+        Replace the roster with ``current`` (user ID -> channel ID), e.g. after connecting. Members who were
+        already in the same channel keep their join time.
+        """
+        at = time.time() if at is None else at
+        for user_id in [user_id for user_id, channel_id in self.member_channel.items()
+                        if current.get(user_id) != channel_id]:
+            self.leave(user_id, at)
+        for user_id, channel_id in current.items():
+            if self.member_channel.get(user_id) != channel_id:
+                self.join(user_id, channel_id, at)
+
+    def members(self, channel_id: int) -> dict[int, float]:
+        """Members in ``channel_id`` right now, as user ID -> join time."""
+        return self.channels.get(channel_id, {})
+
+    def channel_of(self, user_id: int) -> int | None:
+        return self.member_channel.get(user_id)
+
+    def present_since(self, channel_id: int, since: float) -> dict[int, float]:
+        """
+        Members who have been in ``channel_id`` at any point since ``since``: those in it now plus those who left
+        after ``since``, as user ID -> join time (or leave time, for the latter).
+        """
+        present = {user_id: left_at for user_id, left_at in self.left.get(channel_id, {}).items() if left_at >= since}
+        present.update(self.members(channel_id))
+        return present
@@ -0,0 +1,208 @@
+# coding=utf-8
+import asyncio
+import datetime
+import sqlite3
+import time
+import zoneinfo
+from concurrent.futures import Future
+
+from serial_executor import SerialExecutor
+
+now_tz = zoneinfo.ZoneInfo("Asia/Taipei")
+
+
+def month_of(ts: float) -> str:
+    return datetime.datetime.fromtimestamp(ts, now_tz).strftime("%Y-%m")
+
+
+def split_by_month(start: float, end: float) -> list[tuple[str, float]]:
+    """Split [start, end) into (month, seconds) parts at Asia/Taipei month boundaries."""
+    parts = []
+    while start < end:
+        current = datetime.datetime.fromtimestamp(start, now_tz)
+        next_month = (current.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+                      + datetime.timedelta(days=32)).replace(day=1)
+        boundary = min(end, next_month.timestamp())
+        parts.append((current.strftime("%Y-%m"), boundary - start))
+        start = boundary
+    return parts
+
+
+class VoiceSessionStore:
+    """
+    Voice sessions (a member's stay in one voice channel, from join to leave) in SQLite, with monthly totals per
+    member and per channel kept up to date as sessions end, so attendance questions are a single indexed lookup.
+
+    Open sessions are tracked in memory; all writes go to one background thread in order, so voice events never
+    wait on the disk.
+
+    Voice events are missed while the bot is down or disconnected, so the store also keeps a "last seen" time
+    (see beat()). Sessions that turn out to have ended during such a gap are closed at that time rather than when
+    the gap is noticed, so downtime isn't counted as voice time.
+    """
+    # how often the last seen time should be refreshed; at most this much is over-counted after a crash
+    HEARTBEAT_SECONDS = 60
+
+    def __init__(self, path: str = "voice_sessions.sqlite3"):
+        self.path = path
+        self._executor = SerialExecutor("voice-sessions", "Voice session store")
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "user_id INTEGER NOT NULL, "
+                "channel_id INTEGER NOT NULL, "
+                "joined_at REAL NOT NULL, "
+                "left_at REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS sessions_user ON sessions (user_id, joined_at)")
+            for scope in ("member", "channel"):
+                self._conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS {scope}_monthly ("
+                    f"{'user_id' if scope == 'member' else 'channel_id'} INTEGER NOT NULL, "
+                    f"month TEXT NOT NULL, "
+                    f"seconds REAL NOT NULL DEFAULT 0, "
+                    f"sessions INTEGER NOT NULL DEFAULT 0, "
+                    f"PRIMARY KEY ({'user_id' if scope == 'member' else 'channel_id'}, month))"
+                )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS heartbeat (id INTEGER PRIMARY KEY CHECK (id = 0), at REAL NOT NULL)"
+            )
+            rows = self._conn.execute(
+                "SELECT id, user_id, channel_id, joined_at FROM sessions WHERE left_at IS NULL"
+            ).fetchall()
+            heartbeat = self._conn.execute("SELECT at FROM heartbeat WHERE id = 0").fetchone()
+        # last time voice events were known to be arriving
+        self.last_seen: float | None = heartbeat[0] if heartbeat else None
+        # user ID -> (session row ID, channel ID, joined at); row ID is a Future until the insert has run
+        self.open: dict[int, tuple[Future | int, int, float]] = {
+            user_id: (row_id, channel_id, joined_at) for row_id, user_id, channel_id, joined_at in rows
+        }
+        # sessions left open by a previous run that didn't shut down cleanly; whether they went on after the crash
+        # is unknown
+        self.stale: set[int] = set(self.open)
+
+    def _insert(self, user_id: int, channel_id: int, joined_at: float) -> int:
+        with self._conn:
+            return self._conn.execute(
+                "INSERT INTO sessions (user_id, channel_id, joined_at) VALUES (?, ?, ?)",
+                (user_id, channel_id, joined_at),
+            ).lastrowid
+
+    def _close(self, row_id: Future | int, user_id: int, channel_id: int, joined_at: float, left_at: float):
+        if isinstance(row_id, Future):
+            # submitted earlier to this same thread, so it has already run
+            row_id = row_id.result()
+        parts = split_by_month(joined_at, left_at)
+        with self._conn:
+            self._conn.execute("UPDATE sessions SET left_at = ? WHERE id = ?", (left_at, row_id))
+            for i, (month, seconds) in enumerate(parts):
+                # a session is counted in the month it started
+                count = 1 if i == 0 else 0
+                self._conn.execute(
+                    "INSERT INTO member_monthly (user_id, month, seconds, sessions) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (user_id, month) DO UPDATE SET "
+                    "seconds = seconds + excluded.seconds, sessions = sessions + excluded.sessions",
+                    (user_id, month, seconds, count),
+                )
+                self._conn.execute(
+                    "INSERT INTO channel_monthly (channel_id, month, seconds, sessions) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (channel_id, month) DO UPDATE SET "
+                    "seconds = seconds + excluded.seconds, sessions = sessions + excluded.sessions",
+                    (channel_id, month, seconds, count),
+                )
+
+    def _beat(self, at: float):
+        with self._conn:
+            self._conn.execute(
+                "INSERT INTO heartbeat (id, at) VALUES (0, ?) ON CONFLICT (id) DO UPDATE SET at = excluded.at", (at,)
+            )
+
+    def beat(self, at: float | None = None):
+        """
+        Record that voice events are arriving as of ``at``. Call it every ``HEARTBEAT_SECONDS`` while connected to
+        the gateway, and once more on disconnect.
+        """
+        self.last_seen = time.time() if at is None else at
+        self._executor.submit(self._beat, self.last_seen)
+
+    def join(self, user_id: int, channel_id: int, at: float | None = None):
+        at = time.time() if at is None else at
+        if user_id in self.open:
+            # missed the leave (e.g. while disconnected from the gateway)
+            self.leave(user_id, at)
+        self.open[user_id] = (self._executor.submit(self._insert, user_id, channel_id, at), channel_id, at)
+
+    def leave(self, user_id: int, at: float | None = None):
+        session = self.open.pop(user_id, None)
+        if session is None:
+            return
+        row_id, channel_id, joined_at = session
+        self._executor.submit(self._close, row_id, user_id, channel_id, joined_at, time.time() if at is None else at)
+
+    def reconcile(self, current: dict[int, int], at: float | None = None):
+        """
+        Bring open sessions in line with who is in which voice channel right now (user ID -> channel ID), e.g.
+        after a restart or reconnect: sessions of members who have left meanwhile, and sessions left open by a
+        crash, are closed at the last seen time, and members who are in a channel without an open session get one
+        starting at ``at``.
+        """
+        at = time.time() if at is None else at
+        # no heartbeat recorded yet (new database): nothing better to go on than now
+        seen = at if self.last_seen is None else min(self.last_seen, at)
+        for user_id, (_, channel_id, joined_at) in list(self.open.items()):
+            if user_id in self.stale or current.get(user_id) != channel_id:
+                self.leave(user_id, max(joined_at, seen))
+        self.stale.clear()
+        for user_id, channel_id in current.items():
+            if user_id not in self.open:
+                self.join(user_id, channel_id, at)
+        self.beat(at)
+
+    def _open_totals(self, month: str, key_index: int) -> dict[int, tuple[float, int]]:
+        # time spent so far in sessions that are still open
+        totals = {}
+        now = time.time()
+        for user_id, (_, channel_id, joined_at) in list(self.open.items()):
+            key = (user_id, channel_id)[key_index]
+            for i, (part_month, seconds) in enumerate(split_by_month(joined_at, now)):
+                if part_month == month:
+                    seconds_total, count = totals.get(key, (0.0, 0))
+                    totals[key] = (seconds_total + seconds, count + (1 if i == 0 else 0))
+        return totals
+
+    def _monthly(self, scope: str, month: str) -> list[tuple[int, float, int]]:
+        column = "user_id" if scope == "member" else "channel_id"
+        return self._conn.execute(
+            f"SELECT {column}, seconds, sessions FROM {scope}_monthly WHERE month = ?", (month,)
+        ).fetchall()
+
+    async def _totals(self, scope: str, month: str) -> list[tuple[int, float, int]]:
+        rows = await asyncio.wrap_future(self._executor.submit(self._monthly, scope, month))
+        totals = {key: (seconds, count) for key, seconds, count in rows}
+        for key, (seconds, count) in self._open_totals(month, 0 if scope == "member" else 1).items():
+            old_seconds, old_count = totals.get(key, (0.0, 0))
+            totals[key] = (old_seconds + seconds, old_count + count)
+        return sorted(((key, seconds, count) for key, (seconds, count) in totals.items()),
+                      key=lambda row: row[1], reverse=True)
+
+    async def member_totals(self, month: str | None = None) -> list[tuple[int, float, int]]:
+        """
+        (user ID, seconds, sessions) for every member with voice time in ``month`` ("YYYY-MM", default this
+        month), longest first. Includes sessions still in progress.
+        """
+        return await self._totals("member", month or month_of(time.time()))
+
+    async def channel_totals(self, month: str | None = None) -> list[tuple[int, float, int]]:
+        """(channel ID, seconds, sessions) for ``month``, like member_totals."""
+        return await self._totals("channel", month or month_of(time.time()))
+
+    def close(self):
+        # blocking: waits for queued writes. Open sessions end now; reconcile() starts them again on the next run.
+        at = time.time()
+        for user_id in list(self.open):
+            self.leave(user_id, at)
+        self._executor.submit(self._beat, at)
+        self._executor.shutdown()
+        self._conn.close()
@@ -0,0 +1,235 @@
+# coding=utf-8
+import datetime
+import zoneinfo
+from dataclasses import dataclass, field
+
+try:
+    # orjson is optional; it parses event payloads several times faster than the standard library
+    from orjson import loads, JSONDecodeError
+except ImportError:
+    from json import loads, JSONDecodeError
+
+now_tz = zoneinfo.ZoneInfo("Asia/Taipei")
+
+
+class EventDecodeError(ValueError):
+    """A websocket message that isn't a well-formed Roboweb event."""
+
+
+def parse_datetime(value: str | None) -> datetime.datetime | None:
+    """
+    Parse an ISO 8601 timestamp from the panel into an aware datetime in Asia/Taipei.
+    Timestamps without an offset are taken to be in Asia/Taipei already.
+    """
+    if value is None or value == "":
+        return None
+    parsed = datetime.datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=now_tz)
+    return parsed.astimezone(now_tz)
+
+
+@dataclass(slots=True)
+class MeetingPayload:
+    id: int
+    name: str
+    description: str
+    # not sent with every event (e.g. meeting.delete)
+    host: int | None
+    start_time: datetime.datetime
+    end_time: datetime.datetime | None
+    location: str
+    can_absent: bool
+    discord_mentions: list
+    # how long before start_time the reminder goes out
+    notify_offset: datetime.timedelta
+    raw: dict = field(repr=False)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "MeetingPayload":
+        return cls(
+            id=data["id"],
+            name=data["name"],
+            description=data.get("description") or "",
+            host=data.get("host"),
+            start_time=parse_datetime(data["start_time"]),
+            end_time=parse_datetime(data.get("end_time")),
+            location=data.get("location", ""),
+            can_absent=bool(data.get("can_absent", False)),
+            discord_mentions=data.get("discord_mentions") or [],
+            notify_offset=datetime.timedelta(seconds=float(data.get("discord_notify_time", "300"))),
+            raw=data,
+        )
+
+    @property
+    def notify_time(self) -> datetime.datetime:
+        return self.start_time - self.notify_offset
+
+    def entity(self) -> tuple:
+        return "meeting", self.id
+
+
+@dataclass(slots=True)
+class AnnouncementPayload:
+    id: int
+    title: str
+    content: str
+    pin_until: datetime.datetime | None
+    raw: dict = field(repr=False)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "AnnouncementPayload":
+        return cls(
+            id=data["id"],
+            title=data.get("title", ""),
+            content=data.get("content", ""),
+            pin_until=parse_datetime(data.get("pin_until")),
+            raw=data,
+        )
+
+    def entity(self) -> tuple:
+        return "announcement", self.id
+
+
+@dataclass(slots=True)
+class AbsentRequestPayload:
+    id: int
+    meeting: int
+    member: int
+    status: str
+    reason: str
+    reviewer: int | None
+    reviewer_comment: str | None
+    raw: dict = field(repr=False)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "AbsentRequestPayload":
+        return cls(
+            id=data["id"],
+            meeting=data["meeting"],
+            member=data["member"],
+            status=data.get("status", "pending"),
+            reason=data.get("reason", ""),
+            reviewer=data.get("reviewer"),
+            reviewer_comment=data.get("reviewer_comment"),
+            raw=data,
+        )
+
+    def entity(self) -> tuple:
+        # requests of the same meeting are handled in order
+        return "meeting", self.meeting
+
+
+@dataclass(slots=True)
+class WarningDetailPayload:
+    id: int
+    member: int
+    operator: int
+    points: int
+    reason: str
+    notes: str
+    raw: dict = field(repr=False)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "WarningDetailPayload":
+        return cls(
+            id=data["id"],
+            member=data["member"],
+            operator=data["operator"],
+            points=int(data["points"]),
+            reason=data.get("reason", ""),
+            notes=data.get("notes") or "",
+            raw=data,
+        )
+
+    def entity(self) -> tuple:
+        return "member", self.member
+
+
+@dataclass(slots=True)
+class LoginPayload:
+    member_discord_id: int
+    ip: str
+    user_agent: str
+    method: str
+    raw: dict = field(repr=False)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "LoginPayload":
+        return cls(
+            member_discord_id=int(data["member_discord_id"]),
+            ip=data.get("ip", ""),
+            user_agent=data.get("user_agent", ""),
+            method=data.get("method", ""),
+            raw=data,
+        )
+
+    def entity(self) -> tuple:
+        return "discord_id", self.member_discord_id
+
+
+Payload = MeetingPayload | AnnouncementPayload | AbsentRequestPayload | WarningDetailPayload | LoginPayload
+
+# event type, or the prefix of event types without an entry of their own ("meeting" for "meeting.create") ->
+# (key of the nested object in the event, or None if the payload is the event itself; payload type)
+PAYLOAD_TYPES: dict[str, tuple[str | None, type] | None] = {
+    "meeting.request_initial_data": None,
+    "meeting.new_absent_request": ("absent_request", AbsentRequestPayload),
+    "meeting.review_absent_request": ("absent_request", AbsentRequestPayload),
+    "meeting": ("meeting", MeetingPayload),
+    "announcement": ("announcement", AnnouncementPayload),
+    "member.add_warning_points": ("warning_detail", WarningDetailPayload),
+    "auth.new_login": (None, LoginPayload),
+}
+
+
+@dataclass(slots=True)
+class Event:
+    type: str
+    seq: int | None
+    event_id: object
+    # typed view of the event's main object, or None for events without one (e.g. meeting.request_initial_data)
+    payload: Payload | None
+    raw: dict = field(repr=False)
+
+
+def decode_payload(data: dict) -> Payload | None:
+    event_type = data["type"]
+    if event_type in PAYLOAD_TYPES:
+        entry = PAYLOAD_TYPES[event_type]
+    else:
+        entry = PAYLOAD_TYPES.get(event_type.split(".", 1)[0])
+    if entry is None:
+        return None
+    key, payload_type = entry
+    if key is None:
+        return payload_type.from_dict(data)
+    if not isinstance(data.get(key), dict):
+        raise EventDecodeError(f"{event_type}: \"{key}\" is missing or not an object")
+    return payload_type.from_dict(data[key])
+
+
+def decode_event(message: str | bytes, seq_field: str = "seq", id_field: str = "event_id") -> Event:
+    """
+    Decode a websocket message into an Event.
+    :raise EventDecodeError: The message isn't JSON, isn't an object with a "type", or its payload is missing
+    fields / has values of the wrong type.
+    """
+    try:
+        data = loads(message)
+    except JSONDecodeError as e:
+        raise EventDecodeError(f"invalid JSON: {str(e)}") from e
+    if not isinstance(data, dict) or not isinstance(data.get("type"), str):
+        raise EventDecodeError("event is not an object with a \"type\"")
+    seq = data.get(seq_field)
+    if seq is not None and not isinstance(seq, int):
+        raise EventDecodeError(f"{data['type']}: \"{seq_field}\" is not an integer")
+    try:
+        payload = decode_payload(data)
+    except EventDecodeError:
+        raise
+    except KeyError as e:
+        raise EventDecodeError(f"{data['type']}: missing field {str(e)}") from e
+    except (TypeError, ValueError) as e:
+        raise EventDecodeError(f"{data['type']}: {type(e).__name__}: {str(e)}") from e
+    return Event(type=data["type"], seq=seq, event_id=data.get(id_field, seq), payload=payload, raw=data)
@@ -0,0 +1,321 @@
+# coding=utf-8
+import asyncio
+import inspect
+import logging
+import os
+import random
+from collections import OrderedDict, deque
+from json import dump, dumps, load
+from typing import Awaitable, Callable
+
+from websockets.asyncio.client import connect, ClientConnection, USER_AGENT
+from websockets.exceptions import ConnectionClosed
+
+from outbox import Outbox
+from ws_events import Event, EventDecodeError, decode_event
+
+Handler = Callable[[Event], Awaitable[None] | None]
+
+
+class WebSocketStream:
+    def __init__(self, name: str):
+        self.name = name
+        # event type -> handlers; "*" handlers see every event before the type-specific ones
+        self.handlers: dict[str, list[Handler]] = {}
+        self.ws: ClientConnection | None = None
+        self.task: asyncio.Task | None = None
+        # set while queued outbound messages are being flushed after a reconnect
+        self.flushing = False
+        self.flush_task: asyncio.Task | None = None
+        # resume state: highest sequence number up to which every received event has been handled
+        self.cursor: int | None = None
+        # [seq, done] for events in flight, in the order they were received
+        self.pending: deque[list] = deque()
+        # recently received event ids, for de-duplicating replays
+        self.seen: OrderedDict = OrderedDict()
+
+
+class WebSocketManager:
+    """
+    Owns the bot's websocket connections to Roboweb (one per stream, e.g. "meeting" -> WS_URL + "meeting/"),
+    with shared auth, heartbeat and reconnect logic, and routes incoming events to the handlers registered
+    by the cogs.
+
+    Received events are handed to a pool of workers through bounded queues, so a slow handler doesn't hold up
+    the socket. Events for the same entity (see entity_key) always go to the same worker and keep their order;
+    unrelated events are processed in parallel.
+
+    Messages are decoded into typed Events (see ws_events) before they are queued; malformed ones are logged and
+    dropped.
+
+    Events carrying a sequence number (SEQ_FIELD) are resumable: the last fully handled sequence number of each
+    stream is persisted to ``state_path``, a replay from that point is requested after every reconnect, and
+    events that were already received are dropped.
+
+    Outbound messages that can't be sent right away are kept in a durable Outbox and flushed in order once the
+    stream reconnects.
+    """
+    RECONNECT_BASE_DELAY = 2
+    RECONNECT_MAX_DELAY = 60
+    PING_INTERVAL = 20
+    PING_TIMEOUT = 20
+    # defaults; WS_WORKERS / WS_QUEUE_SIZE override them when the manager is created
+    WORKERS = 4
+    # per-worker queue size; the receive loop waits when a worker falls this far behind
+    QUEUE_SIZE = 100
+    SEQ_FIELD = "seq"
+    ID_FIELD = "event_id"
+    RESUME_TYPE = "resume"
+    SEEN_SIZE = 1000
+    SAVE_DELAY = 1
+
+    def __init__(self, base_url: str, token: str, state_path: str = "ws_state.json",
+                 outbox_path: str = "ws_outbox.sqlite3"):
+        self.base_url = base_url
+        self.token = token
+        # read here rather than at import time, so that settings loaded from TOKEN.env by main.py apply
+        self.WORKERS = int(os.getenv("WS_WORKERS", str(self.WORKERS)))
+        self.QUEUE_SIZE = int(os.getenv("WS_QUEUE_SIZE", str(self.QUEUE_SIZE)))
+        self.state_path = state_path
+        self.outbox = Outbox(outbox_path)
+        self.streams: dict[str, WebSocketStream] = {}
+        self.queues: list[asyncio.Queue] = []
+        self.workers: list[asyncio.Task] = []
+        self._save_task: asyncio.Task | None = None
+        self._load_state()
+
+    def _stream(self, name: str) -> WebSocketStream:
+        if name not in self.streams:
+            self.streams[name] = WebSocketStream(name)
+        return self.streams[name]
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        for name, cursor in state.get("cursors", {}).items():
+            self._stream(name).cursor = cursor
+
+    def _save_state(self):
+        # blocking; run it off the event loop
+        state = {"cursors": {name: stream.cursor for name, stream in self.streams.items() if stream.cursor is not None}}
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            dump(state, f)
+        os.replace(tmp_path, self.state_path)
+
+    def _schedule_save(self):
+        # coalesce bursts of cursor updates into a single write
+        if self._save_task is None or self._save_task.done():
+            self._save_task = asyncio.create_task(self._delayed_save())
+
+    async def _delayed_save(self):
+        await asyncio.sleep(self.SAVE_DELAY)
+        try:
+            await asyncio.to_thread(self._save_state)
+        except Exception as e:
+            logging.error(f"Failed to save websocket state: {type(e).__name__}: {str(e)}")
+
+    def register(self, stream: str, event_type: str, handler: Handler):
+        """
+        Route events of ``event_type`` ("*" for every event) on ``stream`` to ``handler``.
+        """
+        self._stream(stream).handlers.setdefault(event_type, []).append(handler)
+
+    def unregister(self, owner: object):
+        """Remove every handler that is a bound method of ``owner`` (e.g. a cog being unloaded)."""
+        for stream in self.streams.values():
+            for event_type, handlers in stream.handlers.items():
+                stream.handlers[event_type] = [h for h in handlers if getattr(h, "__self__", None) is not owner]
+
+    def start(self):
+        """Connect every registered stream. Safe to call again (e.g. from on_ready after a gateway reconnect)."""
+        if not self.workers:
+            self.queues = [asyncio.Queue(maxsize=self.QUEUE_SIZE) for _ in range(self.WORKERS)]
+            self.workers = [asyncio.create_task(self._worker(queue), name=f"websocket-worker-{i}")
+                            for i, queue in enumerate(self.queues)]
+        for stream in self.streams.values():
+            if stream.task is None or stream.task.done():
+                stream.task = asyncio.create_task(self._run(stream), name=f"websocket-{stream.name}")
+
+    async def close(self):
+        if self._save_task is not None and not self._save_task.done():
+            self._save_task.cancel()
+            await asyncio.to_thread(self._save_state)
+        for worker in self.workers:
+            worker.cancel()
+        self.workers, self.queues = [], []
+        for stream in self.streams.values():
+            if stream.task is not None:
+                stream.task.cancel()
+            if stream.flush_task is not None:
+                stream.flush_task.cancel()
+            if stream.ws is not None:
+                await stream.ws.close()
+                stream.ws = None
+        self.outbox.close()
+
+    def is_connected(self, stream: str) -> bool:
+        return stream in self.streams and self.streams[stream].ws is not None
+
+    async def send(self, stream: str, message: dict, coalesce_key: str | None = None) -> bool:
+        """
+        Send ``message`` on ``stream``, or queue it in the outbox if the stream is down (or still flushing older
+        messages) so that it goes out, in order, after the next reconnect.
+        :param coalesce_key: A queued message with the same key on this stream is superseded by this one.
+        :return: True if the message was sent now, False if it was queued.
+        """
+        ws_stream = self._stream(stream)
+        raw = dumps(message)
+        if ws_stream.ws is not None and not ws_stream.flushing and not self.outbox.pending[stream]:
+            try:
+                await ws_stream.ws.send(raw)
+                return True
+            except ConnectionClosed:
+                pass
+        logging.info(f"Websocket \"{stream}\" not available; queued {message.get('type')} in the outbox")
+        await self.outbox.put(stream, raw, coalesce_key)
+        if ws_stream.ws is not None and not ws_stream.flushing:
+            # the stream is up (e.g. a flush finished while this message was being written), so don't leave it
+            # waiting for the next reconnect
+            self._start_flush(ws_stream)
+        return False
+
+    def _start_flush(self, stream: WebSocketStream):
+        stream.flushing = True
+        stream.flush_task = asyncio.create_task(self._flush_in_background(stream, stream.ws))
+
+    async def _flush_in_background(self, stream: WebSocketStream, websocket: ClientConnection):
+        try:
+            await self._flush_outbox(stream, websocket)
+        except ConnectionClosed:
+            # flushed again after the reconnect
+            pass
+        except Exception as e:
+            logging.error(f"Failed to flush the outbox of websocket \"{stream.name}\": {type(e).__name__}: {str(e)}")
+
+    async def _flush_outbox(self, stream: WebSocketStream, websocket: ClientConnection):
+        stream.flushing = True
+        try:
+            while self.outbox.pending[stream.name] > 0:
+                rows = await self.outbox.peek(stream.name)
+                if not rows:
+                    break
+                for row_id, raw in rows:
+                    await websocket.send(raw)
+                    await self.outbox.remove(stream.name, row_id)
+                logging.info(f"Flushed {len(rows)} queued message(s) on websocket \"{stream.name}\"")
+        finally:
+            stream.flushing = False
+
+    async def _run(self, stream: WebSocketStream):
+        attempt = 0
+        while True:
+            logging.info(f"Connecting to websocket \"{stream.name}\" (attempt {attempt + 1})...")
+            try:
+                async with connect(f"{self.base_url}{stream.name}/",
+                                   additional_headers={"Authorization": f"Token {self.token}"},
+                                   user_agent_header=USER_AGENT + " New-Robomania-Bot",
+                                   ping_interval=self.PING_INTERVAL,
+                                   ping_timeout=self.PING_TIMEOUT) as websocket:
+                    stream.ws = websocket
+                    attempt = 0
+                    logging.info(f"Connected to websocket \"{stream.name}\" successfully.")
+                    if stream.cursor is not None:
+                        # ask the panel to replay whatever we missed while disconnected
+                        await websocket.send(dumps({"type": self.RESUME_TYPE, "last_seq": stream.cursor}))
+                    if self.outbox.pending[stream.name]:
+                        await self._flush_outbox(stream, websocket)
+                    async for message in websocket:
+                        try:
+                            event = decode_event(message, self.SEQ_FIELD, self.ID_FIELD)
+                        except EventDecodeError as e:
+                            logging.warning(f"Dropped malformed event on \"{stream.name}\": {str(e)}")
+                            continue
+                        await self._enqueue(stream, event)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Websocket \"{stream.name}\" error: {type(e).__name__}: {str(e)}")
+            finally:
+                stream.ws = None
+            # exponential backoff with jitter, capped so that reconnect latency stays predictable
+            delay = min(self.RECONNECT_MAX_DELAY, self.RECONNECT_BASE_DELAY * 2 ** min(attempt, 10))
+            delay = random.uniform(delay / 2, delay)
+            attempt += 1
+            logging.info(f"Reconnecting to websocket \"{stream.name}\" in {delay:.1f} seconds...")
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    def entity_key(stream: WebSocketStream, event: Event) -> tuple:
+        """The entity an event is about; events with the same key are handled in order."""
+        if event.payload is not None:
+            return stream.name, *event.payload.entity()
+        return stream.name, event.type
+
+    def _is_duplicate(self, stream: WebSocketStream, event: Event) -> bool:
+        if event.seq is not None and stream.cursor is not None and event.seq <= stream.cursor:
+            return True
+        event_id = event.event_id
+        if event_id is None:
+            return False
+        if event_id in stream.seen:
+            return True
+        stream.seen[event_id] = None
+        if len(stream.seen) > self.SEEN_SIZE:
+            stream.seen.popitem(last=False)
+        return False
+
+    def _mark_done(self, stream: WebSocketStream, entry: list | None):
+        if entry is None:
+            return
+        entry[1] = True
+        advanced = False
+        # only move the cursor past events that are handled *and* preceded by handled events
+        while stream.pending and stream.pending[0][1]:
+            stream.cursor = stream.pending.popleft()[0]
+            advanced = True
+        if advanced:
+            self._schedule_save()
+
+    async def _enqueue(self, stream: WebSocketStream, event: Event):
+        if self._is_duplicate(stream, event):
+            logging.debug(f"Dropped duplicate {event.type} on \"{stream.name}\"")
+            return
+        entry = None
+        if event.seq is not None:
+            entry = [event.seq, False]
+            stream.pending.append(entry)
+        if not self.queues:  # start() not called yet
+            try:
+                await self._dispatch(stream, event)
+            finally:
+                self._mark_done(stream, entry)
+            return
+        queue = self.queues[hash(self.entity_key(stream, event)) % len(self.queues)]
+        await queue.put((stream, event, entry))
+
+    async def _worker(self, queue: asyncio.Queue):
+        while True:
+            stream, event, entry = await queue.get()
+            try:
+                await self._dispatch(stream, event)
+            finally:
+                self._mark_done(stream, entry)
+                queue.task_done()
+
+    async def _dispatch(self, stream: WebSocketStream, event: Event):
+        handlers = stream.handlers.get(event.type, [])
+        if not handlers:
+            logging.info(f"Received unknown event on \"{stream.name}\": {event.raw}")
+        for handler in stream.handlers.get("*", []) + handlers:
+            try:
+                result = handler(event)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                # a failing handler must not keep the others (or the worker, or the socket) from running
+                logging.exception(f"Error in {getattr(handler, '__qualname__', handler)} while handling "
+                                  f"{event.type} on \"{stream.name}\": {type(e).__name__}: {str(e)}")